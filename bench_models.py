@@ -0,0 +1,101 @@
+"""
+Memory/access benchmark: plain dict state vs the slotted models.
+
+    python bench_models.py [users] [races] > bench_output.txt
+
+Builds a synthetic users file and races file in the current on-disk format,
+loads them once as plain dicts (the old representation) and once decoded into
+UserProfile/Race records, and reports resident size (tracemalloc) plus the
+cost of the hot field reads.
+"""
+import json
+import random
+import sys
+import timeit
+import tracemalloc
+
+from models import Race, UserProfile, json_default
+
+RANDOMIZERS = ("FF4FE", "FF6WC", "FF1R", "FF5CD", "FFMQR")
+
+
+def synthetic_users(count):
+    rng = random.Random(1)
+    users = {}
+    for i in range(count):
+        played = rng.sample(RANDOMIZERS, rng.randint(1, 3))
+        users[str(100000000000000000 + i)] = {
+            "crystal_shards": rng.randint(0, 500),
+            "races_joined": {r: rng.randint(1, 40) for r in played},
+            "races_won": {r: rng.randint(0, 5) for r in played[:1]}
+        }
+    return json.dumps(users)
+
+
+def synthetic_races(count, runners_per_race=40):
+    rng = random.Random(2)
+    races = {}
+    for i in range(count):
+        uids = [200000000000000000 + rng.randint(0, 10 ** 6) for _ in range(runners_per_race)]
+        races[str(300000000000000000 + i)] = {
+            "race_name": f"ff4fe-{i:04X}-async",
+            "randomizer": "FF4FE",
+            "channel_id": 300000000000000000 + i,
+            "category_id": 1,
+            "guild_id": 2,
+            "race_type": "async",
+            "creator_id": uids[0],
+            "joined_users": uids,
+            "ready_users": [],
+            "runners": {str(u): {"status": "done", "finish_ms": rng.randint(10 ** 6, 10 ** 7)} for u in uids},
+            "started": True,
+            "finished": False,
+            "start_time": "2025-01-01T00:00:00+00:00"
+        }
+    return json.dumps(races)
+
+
+def measure(label, text, decode):
+    tracemalloc.start()
+    data = json.loads(text)
+    if decode:
+        data = {key: decode(value) for key, value in data.items()}
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {current / 1024 / 1024:8.2f} MiB")
+    return data, current
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    race_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"== {user_count} users ==")
+    users_text = synthetic_users(user_count)
+    plain_users, plain_size = measure("dict users", users_text, None)
+    model_users, model_size = measure("UserProfile users", users_text, UserProfile.from_json)
+    print(f"{'saving':<28} {100 * (1 - model_size / plain_size):7.1f} %")
+    assert json.loads(json.dumps(model_users, default=json_default)) == json.loads(users_text)
+
+    print(f"\n== {race_count} races x 40 runners ==")
+    races_text = synthetic_races(race_count)
+    plain_races, plain_size = measure("dict races", races_text, None)
+    model_races, model_size = measure("Race races", races_text, Race.from_json)
+    print(f"{'saving':<28} {100 * (1 - model_size / plain_size):7.1f} %")
+
+    print("\n== hot field reads (1e6 each) ==")
+    user_key = next(iter(plain_users))
+    race_key = next(iter(plain_races))
+    cases = {
+        'dict user["crystal_shards"]': lambda: plain_users[user_key]["crystal_shards"],
+        "profile.crystal_shards": lambda: model_users[user_key].crystal_shards,
+        'dict race.get("started")': lambda: plain_races[race_key].get("started"),
+        'Race race.get("started")': lambda: model_races[race_key].get("started"),
+        "Race race.started": lambda: model_races[race_key].started,
+    }
+    for label, fn in cases.items():
+        print(f"{label:<28} {timeit.timeit(fn, number=1000000):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,42 @@ TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 ANNOUNCE_CHANNEL_ID = int(os.getenv("ANNOUNCE_CHANNEL_ID", 0))
 RACE_ALERT_ROLE_ID = int(os.getenv("RACE_ALERT_ROLE_ID", 0))
 RACE_CATEGORY_ID = int(os.getenv("RACE_CATEGORY_ID", 0))
+# Give each race a race role and a spoiler role instead of per-member channel overwrites
+ROLE_BASED_ACCESS = os.getenv("ROLE_BASED_ACCESS", "false").lower() in ("1", "true", "yes")
+
+# === Countdown ===
+COUNTDOWN_FINE_SECONDS = int(os.getenv("COUNTDOWN_FINE_SECONDS", 10))  # tick every second below this
+COUNTDOWN_COARSE_STEP_SECONDS = int(os.getenv("COUNTDOWN_COARSE_STEP_SECONDS", 10))  # tick step above it
+TIME_DISPLAY_PRECISION = int(os.getenv("TIME_DISPLAY_PRECISION", 3))  # fractional second digits shown (0-3)
+
+# === Outbound Discord actions ===
+DISCORD_ACTION_CONCURRENCY = int(os.getenv("DISCORD_ACTION_CONCURRENCY", 4))  # queued REST calls in flight
+
+# === Application Command Sync ===
+COMMAND_SYNC_HASH_FILE = os.getenv("COMMAND_SYNC_HASH_FILE", "command_sync_hash.json")
+COMMAND_SYNC_GUILD_ID = int(os.getenv("COMMAND_SYNC_GUILD_ID", 0))  # dev: sync to this guild only (0 = global)
+COMMAND_SYNC_FORCE = os.getenv("COMMAND_SYNC_FORCE", "false").lower() in ("1", "true", "yes")
 
 # === Race Data Files ===
 DATA_FILE = os.getenv("RACE_DATA_FILE")
 USERS_FILE = os.getenv("USERS_FILE")
 LAST_ACTIVITY_FILE = os.getenv("LAST_ACTIVITY_FILE", "last_activity.json")
 
+# === Storage Backend ("json" or "sqlite") ===
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+SQLITE_DB_FILE = os.getenv("SQLITE_DB_FILE", "race_data.db")
+
+# === Race Event Journal (empty to disable) ===
+RACE_JOURNAL_FILE = os.getenv("RACE_JOURNAL_FILE", "race_journal.jsonl")
+RACE_JOURNAL_COMPACT_EVERY = int(os.getenv("RACE_JOURNAL_COMPACT_EVERY", 200))
+
+# === Persistence Tuning ===
+# Changes made within this many seconds are coalesced into one write per file
+SAVE_COALESCE_SECONDS = float(os.getenv("SAVE_COALESCE_SECONDS", 2))
+# Chat activity only refreshes a race's timestamp when it is older than this
+ACTIVITY_GRANULARITY_SECONDS = int(os.getenv("ACTIVITY_GRANULARITY_SECONDS", 30))
+ACTIVITY_CHECKPOINT_SECONDS = int(os.getenv("ACTIVITY_CHECKPOINT_SECONDS", 60))
+
 # === Preset JSON file locations ===
 FF4FE_PRESETS_FILE = os.getenv("FF4FE_PRESETS_FILE")
 FF1R_PRESETS_FILE = os.getenv("FF1R_PRESETS_FILE")
@@ -28,6 +58,29 @@ FF6WC_PRESETS_FILE = os.getenv("FF6WC_PRESETS_FILE")
 FF4FE_API_KEY = os.getenv("FF4FE_API_KEY")
 FF6WC_API_KEY = os.getenv("FF6WC_API_KEY")  # optional
 
+# === Seed Generation Limits ===
+SEED_UPSTREAM_CONCURRENCY = int(os.getenv("SEED_UPSTREAM_CONCURRENCY", 3))  # per randomizer API
+SEED_REQUEST_TIMEOUT_SECONDS = float(os.getenv("SEED_REQUEST_TIMEOUT_SECONDS", 10))
+SEED_DEADLINE_SECONDS = float(os.getenv("SEED_DEADLINE_SECONDS", 90))  # whole generate + poll sequence
+SEED_POLL_FIRST_DELAY_SECONDS = float(os.getenv("SEED_POLL_FIRST_DELAY_SECONDS", 0.75))
+SEED_POLL_MAX_DELAY_SECONDS = float(os.getenv("SEED_POLL_MAX_DELAY_SECONDS", 5))
+SEED_POLL_BUDGET_SECONDS = float(os.getenv("SEED_POLL_BUDGET_SECONDS", 60))
+# Identical flags rolled in the same room within the TTL reuse the same seed (0 = no cache).
+# Off by default: a reused seed URL is only harmless for a repeated roll in one room.
+SEED_CACHE_SIZE = int(os.getenv("SEED_CACHE_SIZE", 64))
+SEED_CACHE_TTL_SECONDS = float(os.getenv("SEED_CACHE_TTL_SECONDS", 0))
+
+# === Pre-rolled Seed Pool ===
+SEED_POOL_FILE = os.getenv("SEED_POOL_FILE", "seed_pool.json")
+SEED_POOL_SIZE = int(os.getenv("SEED_POOL_SIZE", 0))  # default per preset (0 = disabled)
+# Background refills in flight at once (kept below SEED_UPSTREAM_CONCURRENCY so /rollseed isn't starved)
+SEED_POOL_REFILL_CONCURRENCY = int(os.getenv("SEED_POOL_REFILL_CONCURRENCY", 1))
+# Per-preset overrides, e.g. "FF4FE:Ladder=3,FF4FE:*=1"
+SEED_POOL_SIZES = {
+    key.strip(): int(size)
+    for key, size in (item.split("=", 1) for item in os.getenv("SEED_POOL_SIZES", "").split(",") if "=" in item)
+}
+
 PRESET_FILES = {
     "FF4FE": FF4FE_PRESETS_FILE,
     "FF1R": FF1R_PRESETS_FILE,
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import persistence
+from bot_config import COMMAND_SYNC_HASH_FILE, COMMAND_SYNC_GUILD_ID, COMMAND_SYNC_FORCE
+
+# === Application command sync ===
+# Global syncs are heavily rate-limited, and on_ready fires again on every
+# gateway reconnect. The registered command schemas are hashed and the hash is
+# stored per scope ("global" or "guild:<id>") after each successful sync; an
+# unchanged hash skips the sync. Set COMMAND_SYNC_GUILD_ID to sync to a single
+# development guild instead (changes show up immediately there), and
+# COMMAND_SYNC_FORCE to sync regardless of the stored hash.
+
+
+def _command_payload(command, tree):
+    try:
+        return command.to_dict(tree)
+    except TypeError:  # discord.py < 2.4
+        return command.to_dict()
+
+
+def command_schema_hash(tree, guild=None) -> str:
+    """Stable hash of the command schemas that tree.sync(guild=guild) would upload."""
+    payload = sorted(
+        (_command_payload(c, tree) for c in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"])
+    )
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _load_hashes():
+    if not COMMAND_SYNC_HASH_FILE or not os.path.exists(COMMAND_SYNC_HASH_FILE):
+        return {}
+    try:
+        with open(COMMAND_SYNC_HASH_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[WARN] Could not read {COMMAND_SYNC_HASH_FILE}: {e}")
+        return {}
+
+
+def _store_hash(scope, digest):
+    if not COMMAND_SYNC_HASH_FILE:
+        return
+    hashes = _load_hashes()
+    hashes[scope] = digest
+    persistence.write_text_atomic(COMMAND_SYNC_HASH_FILE, json.dumps(hashes, indent=2))
+
+
+async def sync_commands(bot) -> bool:
+    """Sync the command tree if its schemas changed since the last sync. Returns True if synced."""
+    guild = None
+    scope = "global"
+    if COMMAND_SYNC_GUILD_ID:
+        guild = bot.get_guild(COMMAND_SYNC_GUILD_ID)
+        if guild is None:
+            print(f"[WARN] COMMAND_SYNC_GUILD_ID {COMMAND_SYNC_GUILD_ID} not found; syncing globally.")
+        else:
+            bot.tree.copy_global_to(guild=guild)
+            scope = f"guild:{guild.id}"
+
+    digest = command_schema_hash(bot.tree, guild)
+    if not COMMAND_SYNC_FORCE and _load_hashes().get(scope) == digest:
+        print(f"[DEBUG] Application commands unchanged ({scope}); skipping sync.")
+        return False
+
+    await bot.tree.sync(guild=guild)
+    _store_hash(scope, digest)
+    print(f"[DEBUG] Application commands synced ({scope}).")
+    return True
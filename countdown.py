@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+from bot_config import COUNTDOWN_FINE_SECONDS, COUNTDOWN_COARSE_STEP_SECONDS
+
+# === Race start countdown ===
+# Ticks are scheduled against a fixed monotonic deadline (never chained sleeps),
+# so send/edit latency cannot accumulate. One message is sent and then edited in
+# place. Long countdowns only tick every COUNTDOWN_COARSE_STEP_SECONDS until the
+# last COUNTDOWN_FINE_SECONDS, which keeps well clear of message rate limits.
+
+GO_TEXT = "🏁 **GO!** The race has started!"
+STALE_TICK_SECONDS = 0.5  # a tick this late is skipped rather than shown
+
+
+def tick_schedule(seconds: int, fine: int = None, coarse: int = None):
+    """Remaining-seconds values to display, in descending order."""
+    fine = COUNTDOWN_FINE_SECONDS if fine is None else fine
+    coarse = max(1, COUNTDOWN_COARSE_STEP_SECONDS if coarse is None else coarse)
+    return [r for r in range(seconds, 0, -1) if r <= fine or r % coarse == 0 or r == seconds]
+
+
+def _tick_text(remaining: int, go_at: datetime) -> str:
+    if remaining > 60:
+        return f"⏳ Race starts <t:{int(go_at.timestamp())}:R> — **{remaining}** seconds..."
+    return f"⏳ **{remaining}**..."
+
+
+async def _sleep_until(loop, when: float):
+    delay = when - loop.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def run_countdown(channel, seconds: int) -> datetime:
+    """
+    Count down in channel and return the scheduled GO instant (aware UTC).
+    The returned instant is the official start: it does not include the
+    latency of the final edit.
+    """
+    seconds = max(0, int(seconds))
+    loop = asyncio.get_running_loop()
+    go_mono = loop.time() + seconds
+    go_at = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+    ticks = tick_schedule(seconds)
+    message = await channel.send(_tick_text(ticks[0], go_at) if ticks else GO_TEXT)
+    for remaining in ticks[1:]:
+        tick_at = go_mono - remaining
+        if loop.time() - tick_at > STALE_TICK_SECONDS:
+            continue  # fell behind (slow edit); catch up instead of showing stale numbers
+        await _sleep_until(loop, tick_at)
+        try:
+            await message.edit(content=_tick_text(remaining, go_at))
+        except Exception as e:
+            print(f"[DEBUG] Countdown tick edit failed: {e}")
+
+    await _sleep_until(loop, go_mono)
+    if ticks:
+        try:
+            await message.edit(content=GO_TEXT)
+        except Exception as e:
+            print(f"[DEBUG] Countdown GO edit failed: {e}; sending instead.")
+            await channel.send(GO_TEXT)
+    return go_at
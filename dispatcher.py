@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+from bot_config import DISCORD_ACTION_CONCURRENCY
+
+# === Outbound Discord action dispatcher ===
+# Non-urgent REST calls (sends, pins, permission edits, reorders, deletes) are
+# queued here instead of being awaited inline by command handlers, so handlers
+# can acknowledge their interaction right away. Actions are ordered by priority,
+# at most one action per route (a Discord rate-limit bucket such as one channel
+# or one guild's channel positions) runs at a time, and at most
+# DISCORD_ACTION_CONCURRENCY run overall. A queued action submitted again under
+# the same coalesce key is replaced by the newer one. Interaction responses are
+# never queued: they have their own webhook bucket and a 3 second deadline.
+
+PRIORITY_REPLY = 0  # user-visible messages in race rooms
+PRIORITY_NORMAL = 1  # permission/role changes, pins, channel deletes
+PRIORITY_COSMETIC = 2  # channel reordering, announcement cleanup
+
+_queue = []  # heap of (priority, seq, action)
+_by_key = {}  # coalesce key -> queued (not yet started) action
+_busy_routes = set()
+_seq = itertools.count()
+_wakeup = None
+_workers = []
+
+
+class _Action:
+    __slots__ = ("route", "factory", "priority", "key", "label", "future", "started")
+
+    def __init__(self, route, factory, priority, key, label, future):
+        self.route = route
+        self.factory = factory
+        self.priority = priority
+        self.key = key
+        self.label = label
+        self.future = future
+        self.started = False
+
+
+def channel_route(channel_id, kind=None):
+    return f"channel:{channel_id}:{kind}" if kind else f"channel:{channel_id}"
+
+
+def guild_route(guild_id, kind):
+    return f"guild:{guild_id}:{kind}"
+
+
+def _consume_exception(future):
+    # Fire-and-forget actions are logged by the worker; don't warn about unretrieved errors
+    if not future.cancelled():
+        future.exception()
+
+
+def submit(route, factory, priority=PRIORITY_NORMAL, key=None, label=None):
+    """
+    Queue factory() (a zero-argument callable returning a coroutine) on route.
+    Returns a future with its result; awaiting it is optional. The factory runs
+    when the action is dispatched, so it should read current state at that point.
+    """
+    global _wakeup
+    loop = asyncio.get_running_loop()
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+
+    queued = _by_key.get(key) if key is not None else None
+    if queued is not None and not queued.started:
+        queued.factory = factory  # newest request wins
+        if priority < queued.priority:
+            queued.priority = priority
+            heapq.heappush(_queue, (priority, next(_seq), queued))
+        return queued.future
+
+    future = loop.create_future()
+    future.add_done_callback(_consume_exception)
+    action = _Action(route, factory, priority, key, label or route, future)
+    if key is not None:
+        _by_key[key] = action
+    heapq.heappush(_queue, (priority, next(_seq), action))
+    _ensure_workers()
+    _wakeup.set()
+    return future
+
+
+def _ensure_workers():
+    _workers[:] = [w for w in _workers if not w.done()]
+    while len(_workers) < DISCORD_ACTION_CONCURRENCY:
+        _workers.append(asyncio.create_task(_worker()))
+
+
+def _next_ready():
+    """Pop the highest-priority action whose route is idle (skipping stale heap entries)."""
+    deferred = []
+    action = None
+    while _queue:
+        entry = heapq.heappop(_queue)
+        candidate = entry[2]
+        if candidate.started or entry[0] != candidate.priority:
+            continue  # already dispatched, or re-queued at a higher priority
+        if candidate.route in _busy_routes:
+            deferred.append(entry)
+            continue
+        action = candidate
+        break
+    for entry in deferred:
+        heapq.heappush(_queue, entry)
+    return action
+
+
+async def _worker():
+    while True:
+        action = _next_ready()
+        if action is None:
+            _wakeup.clear()
+            await _wakeup.wait()
+            continue
+        action.started = True
+        if _by_key.get(action.key) is action:
+            _by_key.pop(action.key, None)
+        _busy_routes.add(action.route)
+        try:
+            result = await action.factory()
+            if not action.future.done():
+                action.future.set_result(result)
+        except Exception as e:
+            print(f"[WARN] Discord action '{action.label}' failed: {e}")
+            if not action.future.done():
+                action.future.set_exception(e)
+        finally:
+            _busy_routes.discard(action.route)
+            _wakeup.set()
+
+
+def pending_count():
+    return sum(1 for priority, _, action in _queue if not action.started and priority == action.priority)
@@ -1,45 +1,149 @@
+import asyncio
 import ctypes
+import time
+import traceback
 import discord
 from discord.ext import commands
 import bot_config
 import race_manager
 import bot_commands          # race commands package
 import bot_commands.user_commands as user_commands  # NEW: user commands
-from bot_commands.race_commands import register_views  # Persistent Join/Watch buttons
+from bot_commands.race_commands import register_views, reorder_all_spoilers_on_startup
+from utils.seeds import cancel_seed_generation
+from utils.seed_pool import start_seed_pool
+from utils.seed_client import close_sessions
+from utils.preset_store import warm_presets
+from utils.command_sync import sync_commands
+
+PROCESS_START = time.perf_counter()
 
 # === Bot Setup ===
+class RaceBot(commands.Bot):
+    async def close(self):
+        await close_sessions()  # upstream randomizer API sessions
+        await super().close()
+
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = RaceBot(command_prefix="!", intents=intents)
 
 # === Set console window title ===
 ctypes.windll.kernel32.SetConsoleTitleW("FFIVALLRace Bot")
 
-@bot.event
-async def on_ready():
-    print(f"✅ Logged in as {bot.user}")
+# === Startup Pipeline ===
+# Runs once per process. on_ready fires again on every gateway reconnect, so the
+# pipeline is started at most once and later ready events only log. Phases run
+# in order; phases grouped together are independent and run concurrently.
+_startup_started = False
+_phase_timings = []
+_first_interaction_logged = False
+
 
+async def _timed(name, step):
+    """Run one phase (sync function or coroutine function) and record its duration."""
+    started = time.perf_counter()
+    try:
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception:
+        print(f"❌ Startup phase '{name}' failed:")
+        traceback.print_exc()
+        raise
+    finally:
+        _phase_timings.append((name, time.perf_counter() - started))
+
+
+async def _run_phases(*phases):
+    await asyncio.gather(*(_timed(name, step) for name, step in phases))
+
+
+def _configure():
     # --- Configure file paths (IMPORTANT for persistence) ---
-    race_manager.configure_files(bot_config.DATA_FILE, bot_config.USERS_FILE)
+    race_manager.configure_files(
+        bot_config.DATA_FILE,
+        bot_config.USERS_FILE,
+        bot_config.LAST_ACTIVITY_FILE,
+        coalesce_seconds=bot_config.SAVE_COALESCE_SECONDS,
+    )
+    race_manager.configure_storage(bot_config.STORAGE_BACKEND, bot_config.SQLITE_DB_FILE)
+    race_manager.configure_journal(bot_config.RACE_JOURNAL_FILE, bot_config.RACE_JOURNAL_COMPACT_EVERY)
+    race_manager.configure_activity(
+        bot_config.ACTIVITY_GRANULARITY_SECONDS,
+        bot_config.ACTIVITY_CHECKPOINT_SECONDS,
+    )
+
 
-    # --- Load persistent data ---
+def _load_state():
     race_manager.load_races()
     race_manager.load_users()
     race_manager.load_last_activity()
 
-    # --- Register slash commands ---
-    bot_commands.register(bot)   # Race-related commands
+
+def _register_commands():
+    bot_commands.register(bot)   # Race-related commands (needs races loaded)
     user_commands.register(bot)  # User/preset commands
+    register_views(bot)          # Persistent Join/Watch buttons
 
-    # --- Register persistent views (Join/Watch buttons) ---
-    register_views(bot)
 
-    # --- Sync commands globally (or use guild sync for dev speed) ---
-    await bot.tree.sync()
+async def _sync_commands():
+    try:
+        await sync_commands(bot)  # skipped when the schemas are unchanged
+    except Exception as e:
+        print(f"[ERROR] Failed to sync commands: {e}")
 
-    # --- Resume pending race cleanup timers ---
-    await race_manager.resume_cleanup_on_startup(bot)
 
-    print("✅ All slash commands registered & persistent cleanup timers resumed!")
+async def _startup():
+    started = time.perf_counter()
+    await _run_phases(("configure", _configure))
+    # Preset files are independent of race/user state: hand them to a worker thread first,
+    # then load state on the loop (its saves need the loop) while the thread reads presets
+    warming = asyncio.create_task(_timed("warm presets", lambda: asyncio.to_thread(warm_presets)))
+    await asyncio.sleep(0)  # let the task submit warm_presets to the thread pool
+    await asyncio.gather(warming, _timed("load state", _load_state))
+    await _run_phases(("register commands", _register_commands))
+    # Commands are dispatched from the local tree, so interactions are handled from here on
+    await _run_phases(
+        ("sync commands", _sync_commands),
+        ("resume cleanup", lambda: race_manager.resume_cleanup_on_startup(bot)),
+        ("reorder spoilers", lambda: reorder_all_spoilers_on_startup(bot)),
+        ("seed pool", start_seed_pool),
+    )
+
+    print(f"✅ Startup finished in {time.perf_counter() - started:.2f}s "
+          f"({time.perf_counter() - PROCESS_START:.2f}s since process start):")
+    for name, seconds in _phase_timings:
+        print(f"   {name:<18} {seconds * 1000:8.1f} ms")
+
+
+@bot.event
+async def on_ready():
+    global _startup_started
+    print(f"✅ Logged in as {bot.user}")
+    if _startup_started:
+        print("[DEBUG] Reconnected; startup already ran, skipping.")
+        return
+    _startup_started = True  # set before the first await so overlapping ready events can't re-enter
+    try:
+        await _startup()
+    except Exception:
+        # The failing phase was already logged. A half-started bot would stay connected
+        # without working commands; stop so it can be restarted
+        print("❌ Startup aborted; shutting down.")
+        await bot.close()
+
+
+@bot.event
+async def on_interaction(interaction):
+    global _first_interaction_logged
+    if not _first_interaction_logged:
+        _first_interaction_logged = True
+        print(f"[DEBUG] First interaction {time.perf_counter() - PROCESS_START:.2f}s after process start.")
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    # Abandon seed generation for race rooms deleted mid-roll
+    cancel_seed_generation(channel.id)
 
 @bot.event
 async def on_message(message):
@@ -47,12 +151,10 @@ async def on_message(message):
     if message.author.bot:
         return
 
-    # Reset activity timer for race channels
+    # Reset activity timer for race channels (in memory; checkpointed periodically)
     channel_id = str(message.channel.id)
     if channel_id in race_manager.races:
-        race_manager.last_activity[channel_id] = discord.utils.utcnow()
-        race_manager.save_last_activity()
-        print(f"⏱️ Activity detected in race channel {message.channel.name}, timer reset.")
+        race_manager.note_activity(channel_id)
 
     await bot.process_commands(message)
 
@@ -0,0 +1,191 @@
+import sys
+from collections.abc import MutableMapping, MutableSet
+
+# === Slotted state models ===
+# Races, runners, results and user profiles are stored as __slots__ records
+# instead of plain dicts. Known fields live in slots (no per-instance __dict__);
+# anything else found in a file is kept in a small overflow dict so it survives
+# a load/save round trip. Records still answer the dict protocol
+# (get / [] / setdefault / pop / in), so existing race.get("...") call sites keep
+# working; hot paths use attributes. to_json()/from_json() read and write the
+# exact on-disk shape used before.
+
+_MISSING = object()
+
+
+class UserSet(MutableSet):
+    """Insertion-ordered set of user ids (O(1) membership); stored on disk as a JSON list."""
+    __slots__ = ("_items",)
+
+    def __init__(self, iterable=()):
+        self._items = dict.fromkeys(iterable)
+
+    def __contains__(self, user_id):
+        return user_id in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, user_id):
+        self._items[user_id] = None
+
+    def discard(self, user_id):
+        self._items.pop(user_id, None)
+
+    def __repr__(self):
+        return f"UserSet({list(self._items)!r})"
+
+
+class SlottedRecord(MutableMapping):
+    """Base for slotted records that also behave like the dicts they replace."""
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **fields):
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    # --- dict protocol ---
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key, _MISSING) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+    # --- JSON codec ---
+    def to_json(self):
+        data = {key: value for key in self.FIELDS if (value := getattr(self, key, _MISSING)) is not _MISSING}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+
+class Runner(SlottedRecord):
+    __slots__ = ("status", "finish_ms", "finish_time")
+    FIELDS = __slots__
+
+
+class Result(SlottedRecord):
+    """Legacy per-user result ({"time": "H:MM:SS" or "FF"}) from files written before finish_ms."""
+    __slots__ = ("time",)
+    FIELDS = __slots__
+
+
+class Race(SlottedRecord):
+    __slots__ = (
+        "race_name", "randomizer", "channel_id", "category_id", "guild_id", "race_type", "creator_id",
+        "joined_users", "ready_users", "runners", "results", "wagers",
+        "started", "start_time", "finished", "live_finished", "async_finished", "async_finalized",
+        "finishasync_used", "done_blocked", "winner_id", "finish_times", "seed_set",
+        "spoilers_channel_id", "race_role_id", "spoiler_role_id",
+        "announcement_channel_id", "announcement_message_id",
+        "cleanup_pending", "cleanup_scheduled_for"
+    )
+    FIELDS = __slots__
+
+    def __init__(self, **fields):
+        self.joined_users = UserSet()
+        self.ready_users = UserSet()
+        self.runners = {}
+        self.started = False
+        self.finished = False
+        super().__init__(**fields)
+
+    def __setitem__(self, key, value):
+        # Keep nested records typed however they are assigned
+        if key in ("joined_users", "ready_users") and not isinstance(value, UserSet):
+            value = UserSet(value or ())
+        elif key == "runners" and value:
+            value = {uid: Runner.from_json(r) for uid, r in value.items()}
+        elif key == "results" and value:
+            value = {uid: Result.from_json(r) for uid, r in value.items()}
+        super().__setitem__(key, value)
+
+
+class UserProfile(SlottedRecord):
+    __slots__ = ("crystal_shards", "races_joined", "races_won")
+    FIELDS = __slots__
+
+    def __init__(self, **fields):
+        self.crystal_shards = 100
+        self.races_joined = {}
+        self.races_won = {}
+        super().__init__(**fields)
+
+    def __setitem__(self, key, value):
+        if key in ("races_joined", "races_won"):
+            # Randomizer names repeat across every profile; share one string object
+            value = {sys.intern(k): v for k, v in (value or {}).items()}
+        super().__setitem__(key, value)
+
+
+def json_default(obj):
+    """json.dumps default= hook: writes records and user sets in their original JSON shape."""
+    if isinstance(obj, SlottedRecord):
+        return obj.to_json()
+    if isinstance(obj, UserSet):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,96 @@
+import asyncio
+import atexit
+import os
+import threading
+
+# === Write-behind persistence ===
+# Stores register a snapshot callable (runs on the event loop and returns the
+# serialized payload) and a writer callable (runs in a worker thread).
+# mark_dirty() only flags a store; the background worker coalesces every change
+# made within COALESCE_SECONDS into one write per store.
+
+COALESCE_SECONDS = 2.0
+
+_stores = {}
+_dirty = set()
+_flush_task = None
+_io_lock = threading.Lock()
+
+
+def configure(coalesce_seconds=None):
+    global COALESCE_SECONDS
+    if coalesce_seconds is not None:
+        COALESCE_SECONDS = max(0.0, float(coalesce_seconds))
+
+
+def register_store(name, snapshot, writer):
+    """Register a named store with its snapshot and writer callables."""
+    _stores[name] = (snapshot, writer)
+
+
+def mark_dirty(name):
+    """Flag a store for the next flush. Writes immediately if no event loop is running."""
+    global _flush_task
+    _dirty.add(name)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush_all_sync()
+        return
+    if _flush_task is None or _flush_task.done():
+        _flush_task = loop.create_task(_flush_worker())
+
+
+async def _flush_worker():
+    while _dirty:
+        await asyncio.sleep(COALESCE_SECONDS)
+        await flush_all()
+
+
+def _take_snapshots():
+    jobs = []
+    for name in list(_dirty):
+        entry = _stores.get(name)
+        _dirty.discard(name)
+        if not entry:
+            continue
+        snapshot, writer = entry
+        try:
+            jobs.append((name, writer, snapshot()))
+        except Exception as e:
+            print(f"❌ Failed to snapshot {name}: {e}")
+    return jobs
+
+
+def _write_jobs(jobs):
+    with _io_lock:
+        for name, writer, payload in jobs:
+            try:
+                writer(payload)
+            except Exception as e:
+                print(f"❌ Failed to persist {name}: {e}")
+                _dirty.add(name)
+
+
+async def flush_all():
+    """Snapshot all dirty stores on the loop and write them off the loop."""
+    jobs = _take_snapshots()
+    if jobs:
+        await asyncio.to_thread(_write_jobs, jobs)
+
+
+def flush_all_sync():
+    """Write all dirty stores now, on the calling thread (used at shutdown)."""
+    _write_jobs(_take_snapshots())
+
+
+def write_text_atomic(path, text):
+    """Write text to path via a temp file so a crash never leaves a truncated file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Guaranteed final flush when the process exits (bot.run returns or Ctrl+C)
+atexit.register(flush_all_sync)
@@ -0,0 +1,131 @@
+from collections import Counter, defaultdict
+from utils.preset_store import add_listener
+
+# === Preset autocomplete index ===
+# Per randomizer: a prefix trie over every word start of every preset name, plus
+# a trigram index for fuzzy matches. Kept in sync incrementally by listening to
+# preset_store reloads, so autocomplete never scans or touches the disk.
+
+MAX_CHOICES = 25  # Discord's autocomplete limit
+FUZZY_THRESHOLD = 0.34  # fraction of query trigrams a fuzzy match must share
+
+_NAMES = "\0"  # trie node key holding the names that pass through the node
+
+
+def _word_starts(lower: str):
+    starts = [0]
+    for i in range(1, len(lower)):
+        if not lower[i - 1].isalnum() and lower[i].isalnum():
+            starts.append(i)
+    return starts
+
+
+def _trigrams(lower: str):
+    padded = f"  {lower} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PresetIndex:
+    def __init__(self):
+        self.names = set()
+        self.trie = {}
+        self.trigrams = defaultdict(set)
+        self.usage = Counter()
+
+    def _trie_paths(self, name: str):
+        lower = name.lower()
+        for start in _word_starts(lower):
+            yield start, lower[start:]
+
+    def add(self, name: str):
+        if name in self.names:
+            return
+        self.names.add(name)
+        for _, suffix in self._trie_paths(name):
+            node = self.trie
+            for ch in suffix:
+                node = node.setdefault(ch, {})
+                node.setdefault(_NAMES, set()).add(name)
+        for gram in _trigrams(name.lower()):
+            self.trigrams[gram].add(name)
+
+    def remove(self, name: str):
+        if name not in self.names:
+            return
+        self.names.discard(name)
+        for _, suffix in self._trie_paths(name):
+            node = self.trie
+            for ch in suffix:
+                node = node.get(ch)
+                if node is None:
+                    break
+                node.get(_NAMES, set()).discard(name)
+        for gram in _trigrams(name.lower()):
+            self.trigrams[gram].discard(name)
+
+    def sync(self, names):
+        """Incrementally apply the difference between the indexed names and names."""
+        names = set(names)
+        for name in self.names - names:
+            self.remove(name)
+        for name in names - self.names:
+            self.add(name)
+
+    def _prefix_matches(self, query: str):
+        node = self.trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get(_NAMES, set())
+
+    def search(self, query: str, limit: int = MAX_CHOICES):
+        """Names ranked by match quality (prefix > word prefix > substring > fuzzy), then usage."""
+        query = query.strip().lower()
+        if not query:
+            ranked = sorted(self.names, key=lambda n: (-self.usage[n], n.lower()))
+            return ranked[:limit]
+
+        scores = {}
+        for name in self._prefix_matches(query):
+            lower = name.lower()
+            scores[name] = 4.0 if lower.startswith(query) else 3.0
+
+        query_grams = _trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for name in self.trigrams.get(gram, ()):
+                shared[name] += 1
+        for name, count in shared.items():
+            if name in scores:
+                continue
+            if query in name.lower():
+                scores[name] = 2.0
+            else:
+                similarity = count / len(query_grams)
+                if similarity >= FUZZY_THRESHOLD:
+                    scores[name] = similarity
+
+        ranked = sorted(scores, key=lambda n: (-scores[n], -self.usage[n], len(n), n.lower()))
+        return ranked[:limit]
+
+
+_indexes = defaultdict(PresetIndex)
+
+
+def _on_presets_loaded(randomizer, presets):
+    _indexes[randomizer].sync(presets.keys())
+
+
+add_listener(_on_presets_loaded)
+
+
+def search_presets(randomizer: str, query: str, limit: int = MAX_CHOICES):
+    return _indexes[randomizer].search(query, limit)
+
+
+def record_preset_usage(randomizer: str, name: str):
+    """Count a preset use so frequently rolled presets rank first."""
+    index = _indexes[randomizer]
+    if name in index.names:
+        index.usage[name] += 1
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import persistence
+from bot_config import PRESET_FILES
+
+# === Cached preset store ===
+# Single code path for reading and writing preset JSON files. Parsed presets
+# are cached per randomizer and only re-read when the file's mtime/size change.
+# Returned dicts are shared with the cache: treat them as read-only.
+
+_cache = {}  # randomizer -> ((mtime_ns, size), presets)
+_lock = threading.Lock()
+_listeners = []
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def add_listener(callback):
+    """Register callback(randomizer, presets), called whenever a preset file is (re)loaded."""
+    _listeners.append(callback)
+
+
+def _store(randomizer, key, presets):
+    _cache[randomizer] = (key, presets)
+    for callback in _listeners:
+        try:
+            callback(randomizer, presets)
+        except Exception as e:
+            print(f"[DEBUG] Preset listener failed for {randomizer}: {e}")
+
+
+def get_presets(randomizer: str, revalidate: bool = True) -> dict:
+    """
+    Presets for a randomizer. revalidate=False never touches the disk and
+    returns whatever is cached (used by autocomplete).
+    """
+    entry = _cache.get(randomizer)
+    if not revalidate:
+        return entry[1] if entry else {}
+
+    file_path = PRESET_FILES.get(randomizer)
+    if not file_path or not os.path.isfile(file_path):
+        if entry:
+            _store(randomizer, None, {})
+        return {}
+
+    key = _stat_key(file_path)
+    if entry and entry[0] == key:
+        return entry[1]
+    with open(file_path, "r") as f:
+        presets = json.load(f)
+    _store(randomizer, key, presets)
+    return presets
+
+
+def add_preset(randomizer: str, name: str, flags: str) -> bool:
+    """Add or replace a preset with an atomic write. Returns False if no file is configured."""
+    file_path = PRESET_FILES.get(randomizer)
+    if not file_path:
+        return False
+    with _lock:
+        presets = dict(get_presets(randomizer))
+        presets[name] = flags
+        persistence.write_text_atomic(file_path, json.dumps(presets, indent=2))
+        _store(randomizer, _stat_key(file_path), presets)
+    return True
+
+
+def warm_presets():
+    """Load every configured preset file into the cache (call on startup)."""
+    for randomizer in PRESET_FILES:
+        try:
+            get_presets(randomizer)
+        except Exception as e:
+            print(f"[WARN] Failed to load presets for {randomizer}: {e}")
@@ -1,149 +1,186 @@
 import re
 import discord
 from discord import app_commands
-import asyncio
 import random
-import os
 from datetime import datetime, timezone
 import traceback
 
 from race_manager import (
-    races, save_races, save_last_activity, last_activity, start_cleanup_timer,
-    award_crystal_shards, increment_participation, users,
-    save_users, ensure_user_exists, touch_activity, load_races
+    races, save_races, save_last_activity, start_cleanup_timer,
+    user_stat_transaction, WIN_SHARDS, PARTICIPATION_SHARDS,
+    touch_activity, record_race_event,
+    find_race_by_name, active_live_race_ids_for, UserSet, Race
 )
 
-from utils.spoilers import get_or_create_spoiler_room
+from utils.spoilers import (
+    get_or_create_spoiler_room, apply_view_overwrites, finisher_members, get_race_role, add_role_to_members
+)
 from utils.wagers import handle_wager_payout
-from utils.seeds import generate_seed, load_presets_for
-from bot_config import ANNOUNCE_CHANNEL_ID, RACE_ALERT_ROLE_ID, RACE_CATEGORY_ID
-
-
-# --- Helper: Normalize legacy statuses ---
-def _normalize_status(status):
-    if status == "ff":
-        return "forfeit"
-    return status
+from utils.seeds import generate_seed
+from utils.seed_pool import take_pooled_seed
+from utils.preset_index import search_presets, record_preset_usage
+from utils.countdown import run_countdown
+from utils.dispatcher import (
+    submit, channel_route, guild_route, PRIORITY_REPLY, PRIORITY_NORMAL, PRIORITY_COSMETIC
+)
+from utils.race_times import (
+    Status, FINAL_STATUSES, runner_status, parse_duration, format_duration, display_precision,
+    finish_ms, set_finished, set_forfeit, clear_finish, ranked_finishers
+)
+from bot_config import ANNOUNCE_CHANNEL_ID, RACE_ALERT_ROLE_ID, RACE_CATEGORY_ID, ROLE_BASED_ACCESS
 
 
 # --- Helper: Check if user is still in an active live race ---
 def user_in_active_live_race(user_id):
-    for race in races.values():
-        if race.get("race_type") != "live" or race.get("finished", False):
-            continue
-
-        if user_id in race.get("joined_users", []):
-            return True
-
-        raw_status = race.get("runners", {}).get(str(user_id), {}).get("status")
-        normalized = _normalize_status(raw_status)
-        if normalized and normalized not in ("done", "forfeit"):
-            return True
-
-    return False
+    # O(1) via race_manager's maintained user -> active live races index
+    return bool(active_live_race_ids_for(user_id))
 
 
 def all_live_done_or_forfeit(race):
     return all(
-        _normalize_status(race.get("runners", {}).get(str(uid), {}).get("status")) in ("done", "forfeit")
+        runner_status(race.get("runners", {}).get(str(uid))) in FINAL_STATUSES
         for uid in race.get("joined_users", [])
     )
 
 
-# === Option 1 helper: strict time string parsing ===
-def parse_strict_time_str(time_str: str) -> str | None:
-    """
-    Accepts S, M:SS, or H:MM:SS. Validates that minutes/seconds are 0-59.
-    Returns canonical H:MM:SS (e.g. "0:05:07") or None if invalid.
-    """
-    parts = time_str.strip().split(":")
-    try:
-        nums = [int(p) for p in parts]
-    except ValueError:
-        return None
-
-    if len(nums) == 1:
-        seconds = nums[0]
-        if seconds < 0:
-            return None
-        h = 0
-        m = seconds // 60
-        s = seconds % 60
-        return f"{h}:{m:02}:{s:02}"
-    elif len(nums) == 2:
-        minutes, seconds = nums
-        if not (0 <= minutes < 60 and 0 <= seconds < 60):
-            return None
-        return f"0:{minutes:02}:{seconds:02}"
-    elif len(nums) == 3:
-        hours, minutes, seconds = nums
-        if hours < 0 or not (0 <= minutes < 60 and 0 <= seconds < 60):
-            return None
-        return f"{hours}:{minutes:02}:{seconds:02}"
-    else:
-        return None
-
-
 # === Shared helpers ===
+_pending_spoiler_grants = {}  # spoiler channel id -> {member id: member} awaiting the queued lock
 async def grant_race_access(channel: discord.TextChannel, member: discord.abc.User, view=True, send=True):
-    """Grant a user access to a race channel."""
-    if channel:
+    """Grant a user access to a race channel (by assigning the race role when the race has one)."""
+    if not channel:
+        return
+    race_role = get_race_role(channel.guild, races.get(str(channel.id), {}), "race_role_id")
+    if race_role and view and send:
+        await add_role_to_members(race_role, [member])
+    else:
         await channel.set_permissions(member, view_channel=view, send_messages=send)
 
 
 async def ensure_spoiler_and_grant(race, guild, user=None):
     """
-    Ensure the spoiler room exists, lock it to finished/forfeit runners,
-    and optionally grant view access to a specific user.
-    Returns the spoiler channel or None.
+    Ensure the spoiler room exists, then queue locking it to finished/forfeit runners
+    (optionally granting a specific user). Locks queued in a burst are coalesced into
+    one overwrite edit. Returns the spoiler channel or None.
     """
     if not race.get("spoilers_channel_id"):
         spoiler = await get_or_create_spoiler_room(guild, race)
         race["spoilers_channel_id"] = spoiler.id
-        save_races()
+        save_races(race.get("channel_id"))
     else:
         spoiler = guild.get_channel(race.get("spoilers_channel_id"))
     if not spoiler:
         return None
 
-    await lock_spoiler_channel_to_finishers(guild, race)
+    grants = _pending_spoiler_grants.setdefault(spoiler.id, {})
     if user:
-        await spoiler.set_permissions(user, view_channel=True)
+        grants[user.id] = user
+
+    async def lock():
+        extra = _pending_spoiler_grants.pop(spoiler.id, {})
+        await lock_spoiler_channel_to_finishers(guild, race, extra_members=list(extra.values()))
+
+    submit(
+        channel_route(spoiler.id), lock, PRIORITY_NORMAL,
+        key=f"spoiler-lock:{spoiler.id}", label=f"lock {spoiler.name}"
+    )
     return spoiler
 
 
+def queue_spoiler_revoke(guild, race, member):
+    """
+    Queue revoking a runner's spoiler access. It runs on the spoiler room's route,
+    so it is serialised with (and ordered after) any lock already queued, and the
+    runner is dropped from pending grants so a later lock cannot re-grant them.
+    """
+    spoiler_id = race.get("spoilers_channel_id")
+    if not spoiler_id:
+        return
+    _pending_spoiler_grants.get(spoiler_id, {}).pop(member.id, None)
+
+    async def revoke():
+        spoiler_role = get_race_role(guild, race, "spoiler_role_id")
+        if spoiler_role:
+            if spoiler_role in getattr(member, "roles", ()):
+                await member.remove_roles(spoiler_role)
+            return
+        spoiler = guild.get_channel(spoiler_id)
+        if spoiler:
+            await apply_view_overwrites(spoiler, {member: False})
+
+    submit(
+        channel_route(spoiler_id), revoke, PRIORITY_NORMAL,
+        key=f"spoiler-revoke:{spoiler_id}:{member.id}", label=f"revoke spoilers for {member.id}"
+    )
+
+
+async def send_error(interaction: discord.Interaction, message: str):
+    """Report an error whether or not the interaction was already answered."""
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+
+def queue_spoiler_reorder(race_channel, spoiler_channel):
+    """Queue (coalesced, lowest priority) placing a spoiler room right below its race room."""
+    submit(
+        guild_route(race_channel.guild.id, "positions"),
+        lambda: ensure_spoiler_below(race_channel, spoiler_channel),
+        PRIORITY_COSMETIC, key=f"spoiler-below:{spoiler_channel.id}", label=f"reorder {spoiler_channel.name}"
+    )
+
+
+def queue_announcement_delete(guild, race):
+    """Queue deleting a race's announcement message (cosmetic, lowest priority)."""
+    ann_channel_id = race.get("announcement_channel_id")
+    ann_message_id = race.get("announcement_message_id")
+    ann_channel = guild.get_channel(ann_channel_id) if ann_channel_id and ann_message_id else None
+    if not ann_channel:
+        return
+
+    async def delete():
+        ann_msg = await ann_channel.fetch_message(ann_message_id)
+        await ann_msg.delete()
+        print(f"[DEBUG] Deleted announcement message {ann_message_id}")
+
+    submit(
+        channel_route(ann_channel_id), delete, PRIORITY_COSMETIC,
+        key=f"announcement-delete:{ann_message_id}", label=f"delete announcement {ann_message_id}"
+    )
+
+
 def format_entrants_display(race, guild):
     """Return the formatted entrants string for /entrants, handling live and async plus winners."""
     race_type = race.get("race_type", "live")
-    results = race.get("results", {}) or {}
     runners_data = race.get("runners", {}) or {}
+    precision = display_precision(race)
     finishasync_used = race.get("finishasync_used", False)
     lines = []
 
     for user_id in race.get("joined_users", []):
         member = guild.get_member(int(user_id))
         name = member.display_name if member else f"Unknown ({user_id})"
-        status = _normalize_status(runners_data.get(str(user_id), {}).get("status", ""))
+        status = runner_status(runners_data.get(str(user_id)))
+        ms = finish_ms(race, user_id) if status is Status.DONE else None
 
         if race_type == "async":
-            if status == "done":
+            if status is Status.DONE:
                 if finishasync_used:
-                    time = results.get(str(user_id), {}).get("time", "??")
+                    time = format_duration(ms, precision) if ms is not None else "??"
                     lines.append(f"**{name}** — Finished in {time}")
                 else:
                     lines.append(f"**{name}** — Finished")
-            elif status == "forfeit":
+            elif status is Status.FORFEIT:
                 lines.append(f"**{name}** — Forfeit")
             else:
                 lines.append(f"**{name}** — Running")
         else:  # live
-            if status == "done":
-                time = results.get(str(user_id), {}).get("time")
-                if time:
-                    lines.append(f"**{name}** — Finished in {time}")
+            if status is Status.DONE:
+                if ms is not None:
+                    lines.append(f"**{name}** — Finished in {format_duration(ms, precision)}")
                 else:
                     lines.append(f"**{name}** — Finished")
-            elif status == "forfeit":
+            elif status is Status.FORFEIT:
                 lines.append(f"**{name}** — Forfeit")
             elif user_id in race.get("ready_users", []):
                 lines.append(f"**{name}** — Ready")
@@ -166,69 +203,86 @@ def format_entrants_display(race, guild):
 
 
 # === Helper: Restrict Spoiler Channel to Finishers/Forfeits ===
-async def lock_spoiler_channel_to_finishers(guild, race):
+async def lock_spoiler_channel_to_finishers(guild, race, extra_members=()):
+    """Bring spoiler overwrites to the desired state with at most one channel edit."""
     spoiler_channel = guild.get_channel(race.get("spoilers_channel_id"))
     if not spoiler_channel:
         return
-    await spoiler_channel.set_permissions(guild.default_role, view_channel=False)
-    for uid, data in race.get("runners", {}).items():
-        status = _normalize_status(data.get("status"))
-        if status in ["done", "forfeit"]:
-            member = guild.get_member(int(uid))
-            if member:
-                await spoiler_channel.set_permissions(member, view_channel=True)
-
-
-# === Channel ordering helpers ===
-async def ensure_spoiler_below(race_channel: discord.TextChannel, spoiler_channel: discord.TextChannel):
-    if race_channel.category_id != spoiler_channel.category_id:
-        return
-    category = race_channel.category
-    if not category:
-        return
-
-    channels = [c for c in category.channels if not isinstance(c, discord.Thread)]
-    channels.sort(key=lambda c: c.position)
-
-    try:
-        race_idx = next(i for i, c in enumerate(channels) if c.id == race_channel.id)
-    except StopIteration:
-        print(f"[WARN] Race channel '{race_channel.name}' not found in category for reordering.")
+    spoiler_role = get_race_role(guild, race, "spoiler_role_id")
+    if spoiler_role:
+        await apply_view_overwrites(spoiler_channel, {guild.default_role: False, spoiler_role: True})
+        await add_role_to_members(spoiler_role, [*finisher_members(guild, race), *extra_members])
         return
+    desired = {guild.default_role: False}
+    for member in [*finisher_members(guild, race), *extra_members]:
+        desired[member] = True
+    await apply_view_overwrites(spoiler_channel, desired)
 
-    if race_idx + 1 < len(channels) and channels[race_idx + 1].id == spoiler_channel.id:
-        return  # already correct
 
-    new_order = []
+# === Channel ordering helpers ===
+def spoiler_target_order(channels, spoiler_after):
+    """
+    channels in position order, rearranged so every spoiler room directly
+    follows its race room. spoiler_after maps race channel id -> spoiler channel.
+    """
+    present = {c.id for c in channels}
+    placed = {spoiler.id for race_id, spoiler in spoiler_after.items() if race_id in present}
+    order = []
     for c in channels:
-        if c.id == race_channel.id:
-            new_order.append(c)
-            new_order.append(spoiler_channel)
-        elif c.id == spoiler_channel.id:
+        if c.id in placed:
             continue
-        else:
-            new_order.append(c)
+        order.append(c)
+        spoiler = spoiler_after.get(c.id)
+        if spoiler:
+            order.append(spoiler)
+    return order
+
+
+async def reorder_category_spoilers(category, spoiler_after):
+    """Apply the target order for one category with a single bulk positions call. Returns True if edited."""
+    # Text and voice channels are positioned independently; race and spoiler rooms are text channels
+    channels = sorted(category.text_channels, key=lambda c: c.position)
+    order = spoiler_target_order(channels, spoiler_after)
+    if [c.id for c in order] == [c.id for c in channels]:
+        return False  # already correct
+    # Reuse the category's existing position values so other categories are unaffected
+    slots = [c.position for c in channels]
+    positions = [{"id": c.id, "position": slots[i]} for i, c in enumerate(order) if c.position != slots[i]]
+    try:
+        print(f"[DEBUG] Reordering {len(positions)} channel(s) in category '{category.name}'.")
+        # discord.py has no public bulk channel reorder; use the bulk positions endpoint directly
+        await category.guild._state.http.bulk_channel_update(
+            category.guild.id, positions, reason="Place spoiler rooms below their race rooms"
+        )
+        return True
+    except Exception as e:
+        print(f"[WARN] bulk reorder failed: {e}; falling back to single-channel edits. Attempted order: {[c.name for c in order]}")
 
-    if hasattr(race_channel.guild, "edit_channel_positions"):
-        positions = [{"id": c.id, "position": idx} for idx, c in enumerate(new_order)]
+    # Fallback: move each displaced spoiler room on its own
+    moved = {p["id"] for p in positions}
+    for race_id, spoiler in spoiler_after.items():
+        race_channel = category.guild.get_channel(race_id)
+        if not race_channel or spoiler.id not in moved:
+            continue
         try:
-            print(f"[DEBUG] Bulk reordering to place '{spoiler_channel.name}' after '{race_channel.name}'.")
-            await race_channel.guild.edit_channel_positions(positions=positions)
-            return
+            target_pos = race_channel.position + 1
+            await spoiler.edit(position=target_pos)
+            print(f"[DEBUG] Fallback: set position of '{spoiler.name}' to {target_pos} to follow '{race_channel.name}'.")
         except Exception as e:
-            print(f"[WARN] bulk reorder failed: {e}; falling back to single-channel edit. Attempted order: {[c.name for c in new_order]}")
+            print(f"[WARN] Fallback reposition failed for '{spoiler.name}': {e}")
+    return True
 
-    # Fallback
-    try:
-        target_pos = race_channel.position + 1
-        await spoiler_channel.edit(position=target_pos)
-        print(f"[DEBUG] Fallback: set position of '{spoiler_channel.name}' to {target_pos} to follow '{race_channel.name}'.")
-    except Exception as e:
-        print(f"[WARN] Fallback reposition failed for '{spoiler_channel.name}': {e}")
+
+async def ensure_spoiler_below(race_channel: discord.TextChannel, spoiler_channel: discord.TextChannel):
+    if race_channel.category_id != spoiler_channel.category_id or not race_channel.category:
+        return
+    await reorder_category_spoilers(race_channel.category, {race_channel.id: spoiler_channel})
 
 
 # === helper: fix existing spoiler ordering on startup ===
 async def reorder_all_spoilers_on_startup(bot):
+    # Group race/spoiler pairs by category so each category gets at most one bulk call
+    by_category = {}
     for channel_id, race in list(races.items()):
         spoiler_id = race.get("spoilers_channel_id")
         if not spoiler_id:
@@ -238,110 +292,148 @@ async def reorder_all_spoilers_on_startup(bot):
             continue
         race_chan = guild.get_channel(race.get("channel_id"))
         spoiler_chan = guild.get_channel(spoiler_id)
-        if race_chan and spoiler_chan:
-            await ensure_spoiler_below(race_chan, spoiler_chan)
-            await asyncio.sleep(0.25)  # throttle to avoid rate limits
+        if race_chan and spoiler_chan and race_chan.category and race_chan.category_id == spoiler_chan.category_id:
+            category = race_chan.category
+            by_category.setdefault(category.id, (category, {}))[1][race_chan.id] = spoiler_chan
 
+    for category, spoiler_after in by_category.values():
+        submit(
+            guild_route(category.guild.id, "positions"),
+            lambda category=category, spoiler_after=spoiler_after: reorder_category_spoilers(category, spoiler_after),
+            PRIORITY_COSMETIC, key=f"category-order:{category.id}", label=f"reorder category {category.name}"
+        )
 
-# === Persistent View for Join/Watch Buttons ===
-class RaceAnnouncementView(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
 
-    @discord.ui.button(label="Join Race", style=discord.ButtonStyle.green, custom_id="join_race_button")
-    async def join_race(self, interaction: discord.Interaction, button: discord.ui.Button):
+# === Join/Watch handlers shared by announcement buttons ===
+async def join_race_from_button(interaction: discord.Interaction, race):
+    try:
+        await interaction.response.defer(ephemeral=True)
+
+        if not race:
+            await interaction.followup.send("❌ This race no longer exists!", ephemeral=True)
+            return
+
+        new_join = False
+        if interaction.user.id not in race.get("joined_users", []):
+            race.setdefault("joined_users", UserSet()).add(interaction.user.id)
+            record_race_event("join", race.get("channel_id"), user_id=interaction.user.id)
+            new_join = True
+            await interaction.followup.send(f"{interaction.user.mention} has joined the race!", ephemeral=True)
+        else:
+            await interaction.followup.send("ℹ️ You are already in this race, access confirmed.", ephemeral=True)
+
+        race_channel = interaction.guild.get_channel(race.get("channel_id"))
+        if race_channel:
+            await grant_race_access(race_channel, interaction.user, view=True, send=True)
+            if new_join:
+                await race_channel.send(f"👋 {interaction.user.display_name} has joined the race!")
+            touch_activity(race_channel.id)
+    except Exception as e:
+        print(f"[ERROR] Join button exception: {e}")
+        traceback.print_exc()
         try:
-            await interaction.response.defer(ephemeral=True)
+            await interaction.followup.send("❌ An error occurred while joining the race.", ephemeral=True)
+        except:
+            pass
 
-            match = re.search(r"\*\*(.*?)\*\*", interaction.message.content)
-            race_name = match.group(1) if match else None
-            if not race_name:
-                await interaction.followup.send("❌ Could not determine race name.", ephemeral=True)
-                return
 
-            race = next((r for r in races.values() if r.get("race_name", "").lower() == race_name.lower()), None)
-            if not race:
-                await interaction.followup.send("❌ This race no longer exists!", ephemeral=True)
-                return
+async def watch_race_from_button(interaction: discord.Interaction, race):
+    try:
+        await interaction.response.defer(ephemeral=True)
+        print(f"[DEBUG] Watch button clicked by {interaction.user}")
 
-            new_join = False
-            if interaction.user.id not in race.get("joined_users", []):
-                race.setdefault("joined_users", []).append(interaction.user.id)
-                save_races()
-                new_join = True
-                await interaction.followup.send(f"{interaction.user.mention} has joined the race!", ephemeral=True)
-            else:
-                await interaction.followup.send("ℹ️ You are already in this race, access confirmed.", ephemeral=True)
-
-            race_channel = interaction.guild.get_channel(race.get("channel_id"))
-            if race_channel:
-                await grant_race_access(race_channel, interaction.user, view=True, send=True)
-                if new_join:
-                    await race_channel.send(f"👋 {interaction.user.display_name} has joined the race!")
-                touch_activity(race_channel.id)
-        except Exception as e:
-            print(f"[ERROR] Join button exception: {e}")
-            traceback.print_exc()
-            try:
-                await interaction.followup.send("❌ An error occurred while joining the race.", ephemeral=True)
-            except:
-                pass
+        if not race:
+            await interaction.followup.send("❌ This race no longer exists!", ephemeral=True)
+            return
+        race_name = race.get("race_name")
 
-    @discord.ui.button(label="Watch Race", style=discord.ButtonStyle.blurple, custom_id="watch_race")
-    async def watch_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        guild = interaction.guild
+        channel = guild.get_channel(race.get("channel_id"))
+        if not channel:
+            await interaction.followup.send(f"❌ Could not locate the channel for `{race_name}`.", ephemeral=True)
+            return
+
+        if not channel.permissions_for(interaction.user).view_channel:
+            await grant_race_access(channel, interaction.user, view=True, send=True)
+            await interaction.followup.send(f"👀 You can now view and chat in `{race_name}`.", ephemeral=True)
+            await channel.send(f"👋 {interaction.user.display_name} is now watching the race.")
+        else:
+            await interaction.followup.send(f"ℹ️ You already have access to `{race_name}`.", ephemeral=True)
+
+        touch_activity(channel.id)
+    except Exception as e:
+        print(f"[ERROR] Watch button exception: {e}")
+        traceback.print_exc()
         try:
-            await interaction.response.defer(ephemeral=True)
-            print(f"[DEBUG] Watch button clicked by {interaction.user}")
+            await interaction.followup.send("❌ An error occurred while watching the race.", ephemeral=True)
+        except:
+            pass
 
-            match = re.search(r"\*\*(.*?)\*\*", interaction.message.content)
-            race_name = match.group(1) if match else None
-            if not race_name:
-                await interaction.followup.send("❌ Could not determine race name.", ephemeral=True)
-                return
 
-            target_race = next((r for r in races.values() if r.get("race_name", "").lower() == race_name.lower()), None)
-            if not target_race:
-                await interaction.followup.send(f"❌ No race found with name `{race_name}`.", ephemeral=True)
-                return
+# === Announcement buttons carrying the race channel id in their custom_id ===
+class JoinRaceButton(discord.ui.DynamicItem[discord.ui.Button], template=r"race:join:(?P<channel_id>[0-9]+)"):
+    def __init__(self, channel_id: int):
+        super().__init__(discord.ui.Button(
+            label="Join Race", style=discord.ButtonStyle.green, custom_id=f"race:join:{channel_id}"
+        ))
+        self.channel_id = channel_id
 
-            guild = interaction.guild
-            channel = guild.get_channel(target_race.get("channel_id"))
-            if not channel:
-                await interaction.followup.send(f"❌ Could not locate the channel for `{race_name}`.", ephemeral=True)
-                return
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["channel_id"]))
 
-            overwrites = channel.overwrites_for(interaction.user)
-            if not overwrites.view_channel:
-                await grant_race_access(channel, interaction.user, view=True, send=True)
-                await interaction.followup.send(f"👀 You can now view and chat in `{race_name}`.", ephemeral=True)
-                await channel.send(f"👋 {interaction.user.display_name} is now watching the race.")
-            else:
-                await interaction.followup.send(f"ℹ️ You already have access to `{race_name}`.", ephemeral=True)
+    async def callback(self, interaction: discord.Interaction):
+        await join_race_from_button(interaction, races.get(str(self.channel_id)))
 
-            touch_activity(channel.id)
-        except Exception as e:
-            print(f"[ERROR] Watch button exception: {e}")
-            traceback.print_exc()
-            try:
-                await interaction.followup.send("❌ An error occurred while watching the race.", ephemeral=True)
-            except:
-                pass
+
+class WatchRaceButton(discord.ui.DynamicItem[discord.ui.Button], template=r"race:watch:(?P<channel_id>[0-9]+)"):
+    def __init__(self, channel_id: int):
+        super().__init__(discord.ui.Button(
+            label="Watch Race", style=discord.ButtonStyle.blurple, custom_id=f"race:watch:{channel_id}"
+        ))
+        self.channel_id = channel_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["channel_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        await watch_race_from_button(interaction, races.get(str(self.channel_id)))
+
+
+def race_announcement_view(channel_id: int) -> discord.ui.View:
+    view = discord.ui.View(timeout=None)
+    view.add_item(JoinRaceButton(channel_id))
+    view.add_item(WatchRaceButton(channel_id))
+    return view
+
+
+# === Legacy Persistent View (announcements posted before buttons carried the channel id) ===
+def _race_from_announcement(interaction: discord.Interaction):
+    match = re.search(r"\*\*(.*?)\*\*", interaction.message.content)
+    _, race = find_race_by_name(match.group(1) if match else None)
+    return race
+
+
+class RaceAnnouncementView(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Join Race", style=discord.ButtonStyle.green, custom_id="join_race_button")
+    async def join_race(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await join_race_from_button(interaction, _race_from_announcement(interaction))
+
+    @discord.ui.button(label="Watch Race", style=discord.ButtonStyle.blurple, custom_id="watch_race")
+    async def watch_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await watch_race_from_button(interaction, _race_from_announcement(interaction))
 
 
 # === Persistent View Registration ===
 def register_views(bot):
-    @bot.event
-    async def on_ready():
-        try:
-            await bot.tree.sync()  # ensure commands are up-to-date
-            print("[DEBUG] Application commands synced.")
-        except Exception as e:
-            print(f"[ERROR] Failed to sync commands: {e}")
-        bot.add_view(RaceAnnouncementView())
-        print(f"[DEBUG] Ready as {bot.user}; persistent views registered.")
-
-        # reorder spoiler rooms under their race rooms
-        await reorder_all_spoilers_on_startup(bot)
+    """Register the persistent Join/Watch buttons (call once; main's startup pipeline does)."""
+    bot.add_view(RaceAnnouncementView())
+    bot.add_dynamic_items(JoinRaceButton, WatchRaceButton)
+    print("[DEBUG] Persistent views registered.")
 
 
 # === Register Commands ===
@@ -374,6 +466,7 @@ def register(bot):
     async def newrace(interaction: discord.Interaction,
                       randomizer: app_commands.Choice[str],
                       race_type: app_commands.Choice[str]):
+        access_role = spoiler_role = channel = None
         try:
             await interaction.response.defer(ephemeral=True)
 
@@ -392,28 +485,32 @@ def register(bot):
 
             hash_code = ''.join(random.choices("0123456789ABCDEF", k=4))
             race_channel_name = f"{randomizer.value.lower()}-{hash_code}-{race_type.value}"
-            channel = await guild.create_text_channel(race_channel_name, category=parent_category)
-
-            races[str(channel.id)] = {
-                "race_name": race_channel_name,
-                "randomizer": randomizer.value,
-                "channel_id": channel.id,
-                "category_id": parent_category.id,
-                "race_type": race_type.value,
-                "creator_id": interaction.user.id,
-                "joined_users": [interaction.user.id],
-                "ready_users": [],
-                "runners": {},
-                "started": False,
-                "finished": False,
-                "guild_id": guild.id
-            }
+            if ROLE_BASED_ACCESS:
+                access_role = await guild.create_role(name=race_channel_name, reason="Race access role")
+                spoiler_role = await guild.create_role(name=f"{race_channel_name}-spoilers", reason="Race spoiler role")
+            # Keep the category's overwrites (staff/bot roles); only hide the room from @everyone
+            overwrites = {**parent_category.overwrites, guild.default_role: discord.PermissionOverwrite(view_channel=False)}
+            if access_role:
+                overwrites[access_role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
+            channel = await guild.create_text_channel(race_channel_name, category=parent_category, overwrites=overwrites)
+
+            races[str(channel.id)] = Race(
+                race_name=race_channel_name,
+                randomizer=randomizer.value,
+                channel_id=channel.id,
+                category_id=parent_category.id,
+                race_type=race_type.value,
+                creator_id=interaction.user.id,
+                joined_users=UserSet([interaction.user.id]),
+                guild_id=guild.id,
+                race_role_id=access_role.id if access_role else None,
+                spoiler_role_id=spoiler_role.id if spoiler_role else None
+            )
 
             touch_activity(channel.id)
-            save_races()
+            record_race_event("create", channel.id, user_id=interaction.user.id)
             save_last_activity()
 
-            await channel.set_permissions(guild.default_role, view_channel=False)
             await grant_race_access(channel, interaction.user, view=True, send=True)
             await channel.send(
                 f"🏁 Race **{race_channel_name}** created using **{randomizer.name}**!\n"
@@ -429,11 +526,11 @@ def register(bot):
                         f"Randomizer: **{randomizer.name}** | Type: **{race_type.name}**\n"
                         "Click below to join or watch:"
                     ),
-                    view=RaceAnnouncementView()
+                    view=race_announcement_view(channel.id)
                 )
                 races[str(channel.id)]["announcement_channel_id"] = announcement_channel.id
                 races[str(channel.id)]["announcement_message_id"] = announcement_msg.id
-                save_races()
+                save_races(channel.id)
 
             await interaction.followup.send(
                 f"✅ Race room `{race_channel_name}` created. You have been added as a runner.",
@@ -442,6 +539,14 @@ def register(bot):
         except Exception as e:
             print(f"[ERROR] /newrace failed: {e}")
             traceback.print_exc()
+            if channel is None:
+                # No race room was created, so race cleanup will never remove these roles
+                for role in (access_role, spoiler_role):
+                    if role:
+                        try:
+                            await role.delete(reason="Race creation failed")
+                        except Exception as cleanup_error:
+                            print(f"[WARN] Could not delete orphaned role {role.name}: {cleanup_error}")
             await interaction.followup.send("❌ Internal error occurred while creating race.", ephemeral=True)
 
     # === /ready ===
@@ -463,9 +568,9 @@ def register(bot):
                 await interaction.response.send_message("✅ You are already marked ready.", ephemeral=True)
                 return
 
-            race.setdefault("ready_users", []).append(interaction.user.id)
+            race.setdefault("ready_users", UserSet()).add(interaction.user.id)
             touch_activity(channel_id)
-            save_races()
+            record_race_event("ready", channel_id, user_id=interaction.user.id)
             await interaction.response.send_message(f"✅ {interaction.user.mention} is ready!", ephemeral=False)
         except Exception as e:
             print(f"[ERROR] /ready failed: {e}")
@@ -519,29 +624,15 @@ def register(bot):
                 await interaction.followup.send("⛔ Not all users are marked ready.", ephemeral=True)
                 return
 
-            try:
-                ann_channel_id = race.get("announcement_channel_id")
-                ann_message_id = race.get("announcement_message_id")
-                if ann_channel_id and ann_message_id:
-                    ann_channel = interaction.guild.get_channel(ann_channel_id)
-                    if ann_channel:
-                        ann_msg = await ann_channel.fetch_message(ann_message_id)
-                        await ann_msg.delete()
-                        print(f"[DEBUG] Deleted announcement message {ann_message_id}")
-            except Exception as e:
-                print(f"[DEBUG] Failed to delete announcement message: {e}")
-
-            await interaction.channel.send(f"⏳ Countdown starting for **{countdown_seconds}** seconds...")
-            for i in range(countdown_seconds, 0, -1):
-                await interaction.channel.send(f"{i}...")
-                await asyncio.sleep(1)
-            await interaction.channel.send("🏁 **GO!** The race has started!")
+            queue_announcement_delete(interaction.guild, race)
+
+            go_at = await run_countdown(interaction.channel, countdown_seconds)
 
             race["started"] = True
-            race["start_time"] = datetime.now(timezone.utc).isoformat()
+            race["start_time"] = go_at.isoformat()  # scheduled GO instant, not when the message landed
             race["finish_times"] = {}
             touch_activity(channel_id)
-            save_races()
+            record_race_event("start", channel_id)
 
             if not race.get("joined_users"):
                 await interaction.followup.send("⚠️ No tracked runners in this live race; auto-finalizing now.")
@@ -578,25 +669,41 @@ def register(bot):
                 return
 
             preset_used = flags_or_preset or "random"
-            seed_url = await asyncio.to_thread(generate_seed, race["randomizer"], preset_used)
+            record_preset_usage(race["randomizer"], preset_used)
+            progress_text = {
+                "queued": "⏳ Seed request queued...",
+                "generating": "⚙️ Generating seed...",
+                "done": "📦 Seed generated, posting...",
+            }
+
+            async def report_progress(state):
+                await interaction.edit_original_response(content=progress_text.get(state, state))
+
+            seed_url = take_pooled_seed(race["randomizer"], preset_used)
+            if not seed_url:
+                seed_url = await generate_seed(
+                    race["randomizer"], preset_used, channel_id=channel_id, on_progress=report_progress
+                )
 
             if seed_url:
                 msg = await interaction.channel.send(
                     f"🔀 **Seed Rolled** using preset/flags: `{preset_used}`\n📎 {seed_url}"
                 )
-                try:
-                    await msg.pin()
-                except Exception as e:
-                    print(f"[DEBUG] Failed to pin message: {e}")
+                submit(channel_route(channel_id, "pins"), msg.pin, PRIORITY_NORMAL, label=f"pin seed in {channel_id}")
                 race["seed_set"] = True
-                save_races()
-                await interaction.followup.send("✅ Seed rolled and pinned.")
+                save_races(channel_id)
+                await interaction.edit_original_response(content="✅ Seed rolled and pinned.")
             else:
+                # Progress was shown publicly; report the failure only to the requester
+                try:
+                    await interaction.delete_original_response()
+                except Exception as e:
+                    print(f"[DEBUG] Could not delete /rollseed progress message: {e}")
                 await interaction.followup.send("⚠️ Failed to generate seed.", ephemeral=True)
         except Exception as e:
             print(f"[ERROR] /rollseed failed: {e}")
             traceback.print_exc()
-            await interaction.response.send_message("❌ Internal error occurred.", ephemeral=True)
+            await send_error(interaction, "❌ Internal error occurred.")
 
     @rollseed.autocomplete("flags_or_preset")
     async def preset_autocomplete(interaction: discord.Interaction, current: str):
@@ -604,12 +711,11 @@ def register(bot):
         race = races.get(channel_id)
         if not race:
             return []
-        presets = load_presets_for(race["randomizer"])
+        # Prebuilt ranked index (kept in sync by the preset store); never touches disk
         return [
             app_commands.Choice(name=name, value=name)
-            for name in presets
-            if current.lower() in name.lower()
-        ][:25]
+            for name in search_presets(race["randomizer"], current)
+        ]
 
     # === /startasync ===
     @bot.tree.command(name="startasync", description="Start an asynchronous race (async only)")
@@ -627,7 +733,7 @@ def register(bot):
             race["started"] = True
             race["start_time"] = datetime.now(timezone.utc).isoformat()
             touch_activity(channel_id)
-            save_races()
+            record_race_event("start", channel_id)
             await interaction.followup.send("🕓 This asynchronous race is now marked as started.", ephemeral=True)
         except Exception as e:
             print(f"[ERROR] /startasync failed: {e}")
@@ -658,7 +764,6 @@ def register(bot):
                 )
                 return
 
-            results = race.setdefault("results", {})
             runners = race.setdefault("runners", {})
 
             if race.get("race_type") == "async":
@@ -667,47 +772,48 @@ def register(bot):
                         "❌ Async races require a time: `/done 1:23:45`.", ephemeral=True
                     )
                     return
-                normalized = parse_strict_time_str(time)
-                if not normalized:
+                submitted_ms = parse_duration(time)
+                if submitted_ms is None:
                     await interaction.response.send_message(
                         "❌ Invalid time format. Use S, M:SS, or H:MM:SS with minutes/seconds 0–59.", ephemeral=True
                     )
                     return
-                results[str(interaction.user.id)] = {"time": normalized}
-                runners[str(interaction.user.id)] = {"status": "done"}
-                save_races()
-                await interaction.response.send_message(f"✅ {interaction.user.mention} has finished in `{normalized}`!", ephemeral=False)
+                set_finished(race, interaction.user.id, submitted_ms)
+                record_race_event("done", channel_id, user_id=interaction.user.id)
+                await interaction.response.send_message(
+                    f"✅ {interaction.user.mention} has finished in `{format_duration(submitted_ms, 0)}`!", ephemeral=False
+                )
             else:
-                if str(interaction.user.id) in results:
+                if runner_status(runners.get(str(interaction.user.id))) in FINAL_STATUSES:
                     await interaction.response.send_message("❌ You’re already marked done.", ephemeral=True)
                     return
                 start_iso = race.get("start_time")
                 if not start_iso:
                     await interaction.response.send_message("❌ Race start time missing; use `/startrace` first.", ephemeral=True)
                     return
-                try:
-                    start_dt = datetime.fromisoformat(start_iso)
-                except Exception:
-                    start_dt = datetime.fromisoformat(start_iso)
-                elapsed = datetime.now(timezone.utc) - start_dt
-                tstr = str(elapsed).split(".")[0]
-                results[str(interaction.user.id)] = {"time": tstr}
-                runners[str(interaction.user.id)] = {"status": "done"}
-                save_races()
-                await interaction.response.send_message(f"✅ {interaction.user.mention} finished in `{tstr}`!", ephemeral=False)
+                start_dt = datetime.fromisoformat(start_iso)
+                # The interaction's snowflake timestamp is when the runner hit enter,
+                # independent of gateway queueing or handler latency
+                elapsed = interaction.created_at - start_dt
+                elapsed_ms = max(0, round(elapsed.total_seconds() * 1000))
+                set_finished(race, interaction.user.id, elapsed_ms)
+                record_race_event("done", channel_id, user_id=interaction.user.id)
+                await interaction.response.send_message(
+                    f"✅ {interaction.user.mention} finished in `{format_duration(elapsed_ms)}`!", ephemeral=False
+                )
 
             spoiler = await ensure_spoiler_and_grant(race, interaction.guild, user=interaction.user)
 
             race_chan = interaction.guild.get_channel(race.get("channel_id"))
             if race_chan and spoiler:
-                await ensure_spoiler_below(race_chan, spoiler)
+                queue_spoiler_reorder(race_chan, spoiler)
 
             if race.get("race_type") == "live" and all_live_done_or_forfeit(race):
                 finalize_race(interaction.guild, race, channel_id)
         except Exception as e:
             print(f"[ERROR] /done failed: {e}")
             traceback.print_exc()
-            await interaction.response.send_message("❌ Internal error occurred.", ephemeral=True)
+            await send_error(interaction, "❌ Internal error occurred.")
 
     # === /undone ===
     @bot.tree.command(name="undone", description="Revert your done or forfeit (or submitted time) so you can redo it")
@@ -728,35 +834,24 @@ def register(bot):
                 return
 
             runners = race.setdefault("runners", {})
-            results = race.setdefault("results", {})
 
             uid_str = str(interaction.user.id)
-            raw_status = runners.get(uid_str, {}).get("status")
-            normalized = _normalize_status(raw_status)
-
-            if normalized not in ("done", "forfeit"):
+            if runner_status(runners.get(uid_str)) not in FINAL_STATUSES:
                 await interaction.response.send_message("ℹ️ You are not marked as done or forfeited; nothing to undo.", ephemeral=True)
                 return
 
             # Remove their result and runner entry
-            results.pop(uid_str, None)
-            runners.pop(uid_str, None)
+            clear_finish(race, uid_str)
 
             # If they were the recorded winner, clear it so it can be recomputed later
             if race.get("winner_id") == uid_str or race.get("winner_id") == interaction.user.id:
                 race["winner_id"] = None
 
-            save_races()
+            record_race_event("undone", channel_id, user_id=interaction.user.id)
             touch_activity(channel_id)
 
             # Revoke spoiler access if applicable
-            if race.get("spoilers_channel_id"):
-                spoiler = interaction.guild.get_channel(race["spoilers_channel_id"])
-                if spoiler:
-                    try:
-                        await spoiler.set_permissions(interaction.user, view_channel=False)
-                    except Exception:
-                        pass
+            queue_spoiler_revoke(interaction.guild, race, interaction.user)
 
             await interaction.response.send_message("✅ Your done/forfeit/time submission has been reverted. You can redo it now.", ephemeral=True)
         except Exception as e:
@@ -795,92 +890,30 @@ def register(bot):
             race["finishasync_used"] = True
             race["done_blocked"] = True
 
-            results = race.setdefault("results", {})
+            # Anyone without a finish is recorded as a forfeit; legacy string/seconds
+            # results are rewritten as integer ms on the way through
             runners_data = race.setdefault("runners", {})
-
-            def format_time(seconds):
-                h = seconds // 3600
-                m = (seconds % 3600) // 60
-                s = seconds % 60
-                return f"{h}:{m:02}:{s:02}"
-
             for user_id in race.get("joined_users", []):
-                user_key = str(user_id)
-                runner = runners_data.get(user_key, {})
-                status = _normalize_status(runner.get("status"))
-                if status == "done" and "finish_time" in runner:
-                    results[user_key] = {"time": format_time(runner["finish_time"])}
-                elif status == "done" and "finish_time" not in runner:
-                    if results.get(user_key, {}).get("time"):
-                        pass
-                    else:
-                        results[user_key] = {"time": "0:00:00"}
-                else:
-                    results[user_key] = {"time": "FF"}
-                    runners_data[user_key] = {"status": "forfeit"}
-
-            def time_to_seconds(timestr):
-                if timestr == "FF":
-                    return float('inf')
-                h, m, s = map(int, timestr.split(":"))
-                return h * 3600 + m * 60 + s
-
-            valid_results = {uid: data for uid, data in results.items() if data["time"] != "FF"}
-            if valid_results:
-                winner_id, _ = min(valid_results.items(), key=lambda x: time_to_seconds(x[1]["time"]))
-                race["winner_id"] = winner_id
-            else:
-                race["winner_id"] = None
-
-            for user_id, data in results.items():
-                if data["time"] != "FF":
-                    h, m, s = map(int, data["time"].split(":"))
-                    total_seconds = h * 3600 + m * 60 + s
-                    runners_data[user_id]["finish_time"] = total_seconds
+                if runner_status(runners_data.get(str(user_id))) is Status.DONE:
+                    set_finished(race, user_id, finish_ms(race, user_id) or 0)
                 else:
-                    runners_data[user_id]["finish_time"] = None
-
-            save_races()
+                    set_forfeit(race, user_id)
 
-            spoiler = await ensure_spoiler_and_grant(race, interaction.guild)
+            save_races(channel_id)
 
             finalize_race(interaction.guild, race, channel_id)
-
-            try:
-                ann_channel_id = race.get("announcement_channel_id")
-                ann_message_id = race.get("announcement_message_id")
-                if ann_channel_id and ann_message_id:
-                    ann_channel = interaction.guild.get_channel(ann_channel_id)
-                    if ann_channel:
-                        ann_msg = await ann_channel.fetch_message(ann_message_id)
-                        await ann_msg.delete()
-                        print(f"[DEBUG] Deleted async announcement message {ann_message_id}")
-            except Exception as e:
-                print(f"[DEBUG] Failed to delete async announcement message: {e}")
-
             start_cleanup_timer(channel_id)
 
-            entrants_list = []
-            for user_id in race.get("joined_users", []):
-                member = interaction.guild.get_member(int(user_id))
-                name = member.display_name if member else f"Unknown ({user_id})"
-                time_value = results.get(str(user_id), {}).get("time", "FF")
-                if time_value == "FF":
-                    entrants_list.append(f"**{name}** — Forfeit")
-                else:
-                    entrants_list.append(f"**{name}** — Finished in {time_value}")
-
-            if race.get("winner_id"):
-                winner_member = interaction.guild.get_member(int(race["winner_id"]))
-                winner_name = winner_member.display_name if winner_member else f"Unknown ({race['winner_id']})"
-                entrants_list.append(f"\n🏆 **Winner: {winner_name}**")
-
-            entrants_display = "\n".join(entrants_list) if entrants_list else "No entrants."
+            # Acknowledge first; spoiler room access and announcement cleanup follow from the queue
+            entrants_display = format_entrants_display(race, interaction.guild)
             await interaction.response.send_message(f"**Async race finalized!**\n{entrants_display}")
+
+            await ensure_spoiler_and_grant(race, interaction.guild)
+            queue_announcement_delete(interaction.guild, race)
         except Exception as e:
             print(f"[ERROR] /finishasync failed: {e}")
             traceback.print_exc()
-            await interaction.response.send_message("❌ Internal error occurred.", ephemeral=True)
+            await send_error(interaction, "❌ Internal error occurred.")
 
     # === /quit ===
     @bot.tree.command(name="quit", description="Leave race tracking but stay in the room")
@@ -893,8 +926,8 @@ def register(bot):
                 await interaction.response.send_message("❌ You are not tracked in this race.", ephemeral=True)
                 return
 
-            race["joined_users"] = [uid for uid in race.get("joined_users", []) if uid != interaction.user.id]
-            race["ready_users"] = [uid for uid in race.get("ready_users", []) if uid != interaction.user.id]
+            race.setdefault("joined_users", UserSet()).discard(interaction.user.id)
+            race.setdefault("ready_users", UserSet()).discard(interaction.user.id)
 
             if "finish_times" in race:
                 race["finish_times"].pop(str(interaction.user.id), None)
@@ -903,7 +936,7 @@ def register(bot):
 
             touch_activity(channel_id)
             save_last_activity()
-            save_races()
+            record_race_event("quit", channel_id, user_id=interaction.user.id)
 
             await interaction.channel.send(f"🚪 {interaction.user.display_name} is no longer a tracked racer in this room.")
             await interaction.response.send_message("✅ You are no longer a tracked racer but still have access.", ephemeral=True)
@@ -931,30 +964,27 @@ def register(bot):
             touch_activity(channel_id)
 
             runners = race.setdefault("runners", {})
-            status = _normalize_status(runners.get(str(interaction.user.id), {}).get("status"))
-            if status in ("done", "forfeit"):
+            if runner_status(runners.get(str(interaction.user.id))) in FINAL_STATUSES:
                 await interaction.response.send_message("⚠️ Already finished or forfeited.", ephemeral=True)
                 return
 
-            runners[str(interaction.user.id)] = {"status": "forfeit"}
-            results = race.setdefault("results", {})
-            results[str(interaction.user.id)] = {"time": "FF"}
-            save_races()
-
-            spoiler = await ensure_spoiler_and_grant(race, interaction.guild, user=interaction.user)
+            set_forfeit(race, interaction.user.id)
+            record_race_event("ff", channel_id, user_id=interaction.user.id)
 
             await interaction.response.send_message(f"🏳️ {interaction.user.mention} forfeited.", ephemeral=False)
 
+            spoiler = await ensure_spoiler_and_grant(race, interaction.guild, user=interaction.user)
+
             race_chan = interaction.guild.get_channel(race.get("channel_id"))
             if race_chan and spoiler:
-                await ensure_spoiler_below(race_chan, spoiler)
+                queue_spoiler_reorder(race_chan, spoiler)
 
             if race.get("race_type") == "live" and all_live_done_or_forfeit(race):
                 finalize_race(interaction.guild, race, channel_id)
         except Exception as e:
             print(f"[ERROR] /ff failed: {e}")
             traceback.print_exc()
-            await interaction.response.send_message("❌ Internal error occurred.", ephemeral=True)
+            await send_error(interaction, "❌ Internal error occurred.")
 
     # === /finishlive ===
     @bot.tree.command(name="finishlive", description="Force finalize a live race (for cleanup when no participants remain)")
@@ -994,36 +1024,36 @@ def register(bot):
 
 # === Finalize Race Helper ===
 def finalize_race(guild, race, channel_id):
-    finishers = [
-        (uid, data["finish_time"])
-        for uid, data in race.get("runners", {}).items()
-        if _normalize_status(data.get("status")) == "done" and data.get("finish_time") is not None
-    ]
+    finishers = ranked_finishers(race)
+    winner_id = finishers[0][0] if finishers else None
+
+    # All shard, win, participation and wager changes land in one users save
+    with user_stat_transaction() as transaction:
+        if winner_id:
+            transaction.add_win(winner_id, race["randomizer"])
+            handle_wager_payout(race, winner_id, transaction)
+        for uid in race.get("runners", {}).keys():
+            transaction.add_participation(uid, race["randomizer"])
 
     if finishers:
-        winner_id, _ = min(finishers, key=lambda x: x[1])
-        award_crystal_shards(winner_id, race["randomizer"])
-        handle_wager_payout(race, winner_id, users)
+        winner_ms = finishers[0][1]
+        race["winner_id"] = winner_id
 
         pot = sum(race.get("wagers", {}).values())
-        total_awarded = 10 + pot + 2
+        total_awarded = WIN_SHARDS + pot + PARTICIPATION_SHARDS
 
         winner_member = guild.get_member(int(winner_id))
         winner_name = winner_member.mention if winner_member else f"<@{winner_id}>"
 
-        channel = guild.get_channel(race.get("channel_id"))
-        if channel:
-            asyncio.create_task(channel.send(
-                f"🏁 Race finished! Winner: {winner_name} — **{total_awarded} shards awarded**"
-            ))
+        message = (
+            f"🏁 Race finished! Winner: {winner_name} in `{format_duration(winner_ms, display_precision(race))}` — "
+            f"**{total_awarded} shards awarded**"
+        )
     else:
-        channel = guild.get_channel(race.get("channel_id"))
-        if channel:
-            asyncio.create_task(channel.send("🏁 Race finished! No finishers to award."))
-
-    for uid in race.get("runners", {}).keys():
-        ensure_user_exists(uid)
-        increment_participation(uid, race["randomizer"])
+        message = "🏁 Race finished! No finishers to award."
+    channel = guild.get_channel(race.get("channel_id"))
+    if channel:
+        submit(channel_route(channel.id), lambda: channel.send(message), PRIORITY_REPLY, label=f"finish message {channel.id}")
 
     # Set appropriate finalization flags
     if race.get("race_type") == "live":
@@ -1031,5 +1061,5 @@ def finalize_race(guild, race, channel_id):
     else:
         race["async_finalized"] = True
 
-    save_races()
+    record_race_event("finalize", channel_id)
     start_cleanup_timer(channel_id)
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+
+# === Append-only race event journal ===
+# One JSON line per lifecycle event, each carrying the race's state after the
+# event. The races snapshot (races.json / SQLite rows) is the compaction point:
+# whenever it is written, the journal lines it already covers are dropped.
+
+JOURNAL_FILE = None
+COMPACT_EVERY = 200  # events appended before a snapshot is forced
+
+_lock = threading.Lock()
+_appended_since_compaction = 0
+
+
+def configure(journal_file, compact_every=None):
+    global JOURNAL_FILE, COMPACT_EVERY
+    JOURNAL_FILE = journal_file
+    if compact_every:
+        COMPACT_EVERY = compact_every
+    if JOURNAL_FILE:
+        _drop_torn_tail()
+
+
+def _drop_torn_tail():
+    """Truncate a partial last line left by a crash, so the next append starts on a fresh line."""
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    with open(JOURNAL_FILE, "rb+") as f:
+        data = f.read()
+        if not data or data.endswith(b"\n"):
+            return
+        keep = data.rfind(b"\n") + 1
+        f.truncate(keep)
+    print(f"[WARN] Dropped a torn last line ({len(data) - keep} bytes) from {JOURNAL_FILE}.")
+
+
+def is_enabled():
+    return bool(JOURNAL_FILE)
+
+
+def append(entry, default=None):
+    """Append one event line. Returns how many events were appended since the last compaction."""
+    global _appended_since_compaction
+    line = json.dumps(entry, default=default) + "\n"
+    with _lock:
+        with open(JOURNAL_FILE, "a") as f:
+            f.write(line)
+        _appended_since_compaction += 1
+        return _appended_since_compaction
+
+
+def position():
+    """Current end of the journal; everything before it is covered by a snapshot taken now."""
+    with _lock:
+        if JOURNAL_FILE and os.path.exists(JOURNAL_FILE):
+            return os.path.getsize(JOURNAL_FILE)
+    return 0
+
+
+def truncate_before(offset):
+    """Drop journal bytes before offset (already in a snapshot), keeping any newer events."""
+    global _appended_since_compaction
+    if not JOURNAL_FILE or not offset:
+        return
+    with _lock:
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        with open(JOURNAL_FILE, "r") as f:
+            f.seek(offset)
+            tail = f.read()
+        tmp_path = f"{JOURNAL_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(tail)
+        os.replace(tmp_path, JOURNAL_FILE)
+        _appended_since_compaction = tail.count("\n")
+
+
+def replay(races):
+    """Apply journaled events on top of a loaded snapshot. Returns the number of events applied."""
+    if not JOURNAL_FILE or not os.path.exists(JOURNAL_FILE):
+        return 0
+    applied = 0
+    with open(JOURNAL_FILE, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash; later lines are still valid
+            channel_id = entry.get("channel_id")
+            if not channel_id:
+                continue
+            if entry.get("race") is None:
+                races.pop(channel_id, None)
+            else:
+                races[channel_id] = entry["race"]
+            applied += 1
+    return applied
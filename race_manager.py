@@ -1,9 +1,21 @@
 import json
 import os
 import asyncio
+import atexit
+import heapq
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
+import discord
 from discord.ext import tasks
 
+import persistence
+import sqlite_store
+import race_journal
+from models import UserSet, Race, UserProfile, json_default
+from utils.seeds import cancel_seed_generation
+from utils.dispatcher import submit, channel_route, guild_route, PRIORITY_NORMAL, PRIORITY_COSMETIC
+
 # === Globals ===
 races = {}
 users = {}
@@ -14,112 +26,494 @@ DATA_FILE = None
 USERS_FILE = None
 LAST_ACTIVITY_FILE = "last_activity.json"
 
-# === Internal bot reference for reap loop ===
+# === Storage backend ("json" or "sqlite") ===
+STORAGE_BACKEND = "json"
+_dirty_keys = {"races": set(), "users": set(), "last_activity": set()}
+
+# === Secondary race indexes (kept in sync by index_race/unindex_race) ===
+_race_by_name = {}  # lowercased race_name -> channel_id
+_races_by_guild = defaultdict(set)  # guild_id -> {channel_id}
+_races_by_state = defaultdict(set)  # race_state -> {channel_id}
+_indexed = {}  # channel_id -> (name_key, guild_id, state) currently indexed
+_active_live_races_by_user = defaultdict(set)  # user_id (int) -> {channel_id} of unfinished live races
+_indexed_users = {}  # channel_id -> {user_id} currently indexed as active
+
+# === Internal bot reference and state for the cleanup scheduler ===
 _bot_ref = None
+_cleanup_heap = []  # (due epoch seconds, channel_id)
+_cleanup_due = {}  # channel_id -> current due epoch seconds
+_cleanup_wakeup = None  # asyncio.Event, created by the scheduler task
+_cleanup_task = None
 
 # === Thresholds ===
 CLEANUP_THRESHOLD_SECONDS = 10 * 60  # 10 minutes
+CLEANUP_RETRY_SECONDS = 60  # retry delay when a due cleanup could not complete
+CLEANUP_CONCURRENCY = 5  # race rooms cleaned up at once
+CLEANUP_DELETE_ATTEMPTS = 3  # tries per delete before giving up until the next retry
+CLEANUP_BACKOFF_SECONDS = 1  # first retry delay; doubles per attempt
+ACTIVITY_GRANULARITY_SECONDS = 30  # chat activity older than this refreshes the timestamp
+ACTIVITY_CHECKPOINT_SECONDS = 60  # how often chat activity is persisted
+
+# === Shard rewards ===
+WIN_SHARDS = 10
+PARTICIPATION_SHARDS = 2
+
+# === In-memory activity tracker state ===
+_activity_dirty = False
 
 
-def configure_files(data_file, users_file, last_activity_file=None):
+def configure_files(data_file, users_file, last_activity_file=None, coalesce_seconds=None):
     global DATA_FILE, USERS_FILE, LAST_ACTIVITY_FILE
     DATA_FILE = data_file
     USERS_FILE = users_file
     if last_activity_file:
         LAST_ACTIVITY_FILE = last_activity_file
+    persistence.configure(coalesce_seconds)
+
+
+def configure_activity(granularity_seconds=None, checkpoint_seconds=None):
+    global ACTIVITY_GRANULARITY_SECONDS, ACTIVITY_CHECKPOINT_SECONDS
+    if granularity_seconds is not None:
+        ACTIVITY_GRANULARITY_SECONDS = granularity_seconds
+    if checkpoint_seconds:
+        ACTIVITY_CHECKPOINT_SECONDS = checkpoint_seconds
+        _checkpoint_activity.change_interval(seconds=checkpoint_seconds)
+
+
+# === Record Codecs (on-disk format unchanged) ===
+_json_default = json_default
+
+
+def _decode_race(race):
+    return Race.from_json(race)
+
+
+def _encode_race_row(race):
+    return json.dumps(race, sort_keys=True, default=_json_default)
+
+
+def _encode_user_row(profile):
+    return json.dumps(profile, sort_keys=True, default=_json_default)
+
+
+# === Storage Backend ===
+def configure_storage(backend="json", sqlite_file=None):
+    """Select the storage backend. "sqlite" migrates the JSON files once, then uses per-row updates."""
+    global STORAGE_BACKEND
+    STORAGE_BACKEND = (backend or "json").lower()
+    if STORAGE_BACKEND != "sqlite":
+        return
+    sqlite_store.open_db(sqlite_file or "race_data.db")
+    if sqlite_store.get_meta("json_migrated"):
+        return
+    legacy_races = _read_json_file(DATA_FILE)
+    legacy_users = _read_json_file(USERS_FILE)
+    legacy_activity = _read_json_file(LAST_ACTIVITY_FILE)
+    counts = (
+        sqlite_store.migrate_rows("races", legacy_races, _encode_race_row, _race_columns),
+        sqlite_store.migrate_rows("users", legacy_users, sqlite_store.encode_json),
+        sqlite_store.migrate_rows("last_activity", legacy_activity, str),
+    )
+    sqlite_store.set_meta("json_migrated", datetime.now(timezone.utc).isoformat())
+    print(f"[DEBUG] Migrated JSON data to SQLite: {counts[0]} races, {counts[1]} users, {counts[2]} activity rows.")
+
+
+def _read_json_file(path):
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def race_state(race):
+    """Coarse lifecycle state of a race: open, started or finished (Race or legacy dict)."""
+    if race.get("live_finished") or race.get("finishasync_used") or race.get("async_finalized"):
+        return "finished"
+    if race.get("started"):
+        return "started"
+    return "open"
+
+
+def _race_columns(race):
+    return race.get("race_name"), race.get("guild_id"), race_state(race)
+
+
+def _mark_dirty(store, key=None):
+    # key=None means "anything may have changed" (full diff for SQLite)
+    keys = _dirty_keys[store]
+    if key is None or keys is None:
+        _dirty_keys[store] = None
+    else:
+        keys.add(str(key))
+    persistence.mark_dirty(store)
+
+
+def _take_dirty_keys(store):
+    keys = _dirty_keys[store]
+    _dirty_keys[store] = set()
+    return keys or None
+
+
+def _snapshot_rows(table, current, encode, columns=None, keys=None):
+    upserts, deletes = sqlite_store.diff_rows(table, current, encode, columns, keys)
+    return "sqlite", table, upserts, deletes
+
+
+def _write_payload(payload):
+    if payload[0] == "sqlite":
+        _, table, upserts, deletes = payload
+        sqlite_store.write_rows(table, upserts, deletes)
+    else:
+        _, path, text = payload
+        if path:
+            persistence.write_text_atomic(path, text)
 
 
 # === Race Data Persistence ===
 def load_races():
-    if DATA_FILE and os.path.exists(DATA_FILE):
+    if STORAGE_BACKEND == "sqlite":
+        races.update({k: json.loads(v) for k, v in sqlite_store.load_table("races").items()})
+    elif DATA_FILE and os.path.exists(DATA_FILE):
         with open(DATA_FILE, "r") as f:
             races.update(json.load(f))
 
+    # Replay events recorded after the last snapshot, then compact them into it
+    replayed = race_journal.replay(races)
+    if replayed:
+        print(f"[DEBUG] Replayed {replayed} race journal events.")
+        save_races()
+    for channel_id, race in races.items():
+        races[channel_id] = _decode_race(race)
+    rebuild_race_indexes()
+
+
+# === Race Indexes ===
+def _active_live_users(race):
+    # Same rule as the old full scan: tracked runners plus anyone whose status isn't final
+    if race.get("race_type") != "live" or race.get("finished"):
+        return set()
+    active = set(race.get("joined_users", ()))
+    for uid, data in race.get("runners", {}).items():
+        if data.get("status") and data.get("status") not in ("done", "ff", "forfeit"):
+            active.add(int(uid))
+    return active
+
 
-def save_races():
-    if DATA_FILE:
-        with open(DATA_FILE, "w") as f:
-            json.dump(races, f, indent=4)
+def unindex_race(channel_id):
+    channel_id = str(channel_id)
+    for user_id in _indexed_users.pop(channel_id, ()):
+        _active_live_races_by_user[user_id].discard(channel_id)
+        if not _active_live_races_by_user[user_id]:
+            del _active_live_races_by_user[user_id]
+    entry = _indexed.pop(channel_id, None)
+    if not entry:
+        return
+    name_key, guild_id, state = entry
+    if _race_by_name.get(name_key) == channel_id:
+        del _race_by_name[name_key]
+    _races_by_guild[guild_id].discard(channel_id)
+    _races_by_state[state].discard(channel_id)
+
+
+def index_race(channel_id):
+    """(Re)index one race by name, guild and state; unindexes it if it no longer exists."""
+    channel_id = str(channel_id)
+    unindex_race(channel_id)
+    race = races.get(channel_id)
+    if not race:
+        return
+    name_key = (race.get("race_name") or "").lower()
+    guild_id = race.get("guild_id")
+    state = race_state(race)
+    _indexed[channel_id] = (name_key, guild_id, state)
+    if name_key:
+        _race_by_name[name_key] = channel_id
+    _races_by_guild[guild_id].add(channel_id)
+    _races_by_state[state].add(channel_id)
+    active_users = _active_live_users(race)
+    _indexed_users[channel_id] = active_users
+    for user_id in active_users:
+        _active_live_races_by_user[user_id].add(channel_id)
+
+
+def rebuild_race_indexes():
+    for channel_id in list(_indexed):
+        unindex_race(channel_id)
+    for channel_id in races:
+        index_race(channel_id)
+
+
+def find_race_by_name(race_name):
+    """Return (channel_id, race) for a race name (case-insensitive), or (None, None)."""
+    channel_id = _race_by_name.get((race_name or "").lower())
+    race = races.get(channel_id) if channel_id else None
+    return (channel_id, race) if race else (None, None)
+
+
+def race_ids_in_guild(guild_id):
+    return set(_races_by_guild.get(guild_id, ()))
+
+
+def race_ids_in_state(state):
+    return set(_races_by_state.get(state, ()))
+
+
+def active_live_race_ids_for(user_id):
+    """Channel ids of unfinished live races the user is still tracked/running in."""
+    return set(_active_live_races_by_user.get(int(user_id), ()))
+
+
+def _snapshot_races():
+    # Everything journaled up to now is contained in this snapshot
+    journal_offset = race_journal.position()
+    keys = _take_dirty_keys("races")
+    if STORAGE_BACKEND == "sqlite":
+        if keys is not None:
+            journal_offset = 0  # partial row update; journal still needed for other races
+        return journal_offset, _snapshot_rows("races", races, _encode_race_row, _race_columns, keys)
+    return journal_offset, ("file", DATA_FILE, json.dumps(races, indent=4, default=_json_default))
+
+
+def _write_races(payload):
+    journal_offset, inner = payload
+    _write_payload(inner)
+    race_journal.truncate_before(journal_offset)
+
+
+def save_races(channel_id=None):
+    """Mark races (or just one race) dirty; the write-behind worker persists them."""
+    if channel_id is not None and race_journal.is_enabled():
+        # A keyed row write does not compact the journal, so an older journaled copy of
+        # this race would win on replay; journal the new state instead
+        record_race_event("update", channel_id)
+        return
+    if DATA_FILE or STORAGE_BACKEND == "sqlite":
+        _mark_dirty("races", channel_id)
+
+
+# === Race Event Journal ===
+def configure_journal(journal_file, compact_every=None):
+    race_journal.configure(journal_file, compact_every)
+
+
+def record_race_event(event, channel_id, **details):
+    """
+    Record a race lifecycle event (join, ready, start, done, ff, undone, finalize, cleanup,
+    or "update" for any other change saved through save_races(channel_id)).
+    With the journal enabled this is an O(1) append and the snapshot is only rewritten
+    every COMPACT_EVERY events; otherwise it falls back to save_races.
+    """
+    channel_id = str(channel_id)
+    index_race(channel_id)
+    if not race_journal.is_enabled():
+        save_races(channel_id)
+        return
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "event": event,
+        "channel_id": channel_id,
+        "race": races.get(channel_id),
+        **details
+    }
+    try:
+        appended = race_journal.append(entry, default=_json_default)
+    except Exception as e:
+        print(f"❌ Failed to journal {event} for {channel_id}: {e}")
+        save_races()  # full snapshot, which also compacts older journal entries
+        return
+    if appended >= race_journal.COMPACT_EVERY:
+        save_races()
 
 
 # === Users Data Persistence ===
 def load_users():
-    global users
-    if USERS_FILE and os.path.exists(USERS_FILE):
+    if STORAGE_BACKEND == "sqlite":
+        users.update({k: json.loads(v) for k, v in sqlite_store.load_table("users").items()})
+    elif USERS_FILE and os.path.exists(USERS_FILE):
         with open(USERS_FILE, "r") as f:
             users.update(json.load(f))
-    for uid in list(users.keys()):
-        ensure_user_exists(uid)
+    for uid, data in users.items():
+        users[uid] = UserProfile.from_json(data)
+
+
+def _snapshot_users():
+    if STORAGE_BACKEND == "sqlite":
+        return _snapshot_rows("users", users, _encode_user_row, keys=_take_dirty_keys("users"))
+    _take_dirty_keys("users")
+    return "file", USERS_FILE, json.dumps(users, indent=4, default=_json_default)
 
 
-def save_users():
-    if USERS_FILE:
-        with open(USERS_FILE, "w") as f:
-            json.dump(users, f, indent=4)
+def save_users(*user_ids):
+    """Mark users (or just the given users) dirty; the write-behind worker persists them."""
+    if USERS_FILE or STORAGE_BACKEND == "sqlite":
+        if not user_ids:
+            _mark_dirty("users")
+        for uid in user_ids:
+            _mark_dirty("users", uid)
 
 
 # === Last Activity Persistence ===
 def load_last_activity():
     global last_activity
-    if LAST_ACTIVITY_FILE and os.path.exists(LAST_ACTIVITY_FILE):
+    data = None
+    if STORAGE_BACKEND == "sqlite":
+        data = sqlite_store.load_table("last_activity")
+    elif LAST_ACTIVITY_FILE and os.path.exists(LAST_ACTIVITY_FILE):
         with open(LAST_ACTIVITY_FILE, "r") as f:
             data = json.load(f)
-            parsed = {}
-            for k, v in data.items():
-                try:
-                    parsed[k] = datetime.fromisoformat(v)
-                except Exception:
-                    continue
-            last_activity = parsed  # assign to module-level
+    if data is not None:
+        parsed = {}
+        for k, v in data.items():
+            try:
+                parsed[k] = datetime.fromisoformat(v)
+            except Exception:
+                continue
+        last_activity = parsed  # assign to module-level
     # else leave as empty dict
 
 
-def save_last_activity():
-    if LAST_ACTIVITY_FILE:
-        with open(LAST_ACTIVITY_FILE, "w") as f:
-            serializable = {}
-            for k, v in last_activity.items():
-                if isinstance(v, datetime):
-                    serializable[k] = v.isoformat()
-            json.dump(serializable, f, indent=4)
+def _encode_activity(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _snapshot_last_activity():
+    if STORAGE_BACKEND == "sqlite":
+        return _snapshot_rows("last_activity", last_activity, _encode_activity, keys=_take_dirty_keys("last_activity"))
+    _take_dirty_keys("last_activity")
+    serializable = {}
+    for k, v in last_activity.items():
+        if isinstance(v, datetime):
+            serializable[k] = v.isoformat()
+    return "file", LAST_ACTIVITY_FILE, json.dumps(serializable, indent=4)
+
+
+def save_last_activity(channel_id=None):
+    """Mark last activity dirty; the write-behind worker persists it."""
+    if LAST_ACTIVITY_FILE or STORAGE_BACKEND == "sqlite":
+        _mark_dirty("last_activity", channel_id)
+
+
+persistence.register_store("races", _snapshot_races, _write_races)
+persistence.register_store("users", _snapshot_users, _write_payload)
+persistence.register_store("last_activity", _snapshot_last_activity, _write_payload)
 
 
-# === Activity Helper ===
+async def flush_state():
+    """Persist any pending race/user/activity changes immediately."""
+    await persistence.flush_all()
+
+
+# === Activity Helpers ===
 def touch_activity(channel_id):
     channel_id = str(channel_id)
     last_activity[channel_id] = datetime.now(timezone.utc)
-    save_last_activity()
+    save_last_activity(channel_id)
+    if channel_id in _cleanup_due:
+        schedule_cleanup(channel_id)  # activity pushes the cleanup deadline out
+
+
+def note_activity(channel_id):
+    """
+    Record chat activity in memory only (hot path for on_message).
+    The timestamp is refreshed at most once per ACTIVITY_GRANULARITY_SECONDS
+    and persisted by the periodic checkpoint loop.
+    """
+    global _activity_dirty
+    channel_id = str(channel_id)
+    now = datetime.now(timezone.utc)
+    last = last_activity.get(channel_id)
+    if isinstance(last, datetime) and (now - last).total_seconds() < ACTIVITY_GRANULARITY_SECONDS:
+        return
+    last_activity[channel_id] = now
+    _activity_dirty = True
+    if channel_id in _cleanup_due:
+        schedule_cleanup(channel_id)
+
+
+@tasks.loop(seconds=ACTIVITY_CHECKPOINT_SECONDS)
+async def _checkpoint_activity():
+    global _activity_dirty
+    if _activity_dirty:
+        _activity_dirty = False
+        save_last_activity()
+
+
+def _checkpoint_activity_on_exit():
+    # Runs before persistence's own atexit flush (atexit is LIFO)
+    if _activity_dirty:
+        save_last_activity()
+
+
+atexit.register(_checkpoint_activity_on_exit)
 
 
 # === User Helpers ===
 def ensure_user_exists(user_id):
     user_id = str(user_id)
     if user_id not in users:
-        users[user_id] = {
-            "crystal_shards": 100,
-            "races_joined": {},
-            "races_won": {}
-        }
-    else:
-        users[user_id].setdefault("crystal_shards", 100)
-        users[user_id].setdefault("races_joined", {})
-        users[user_id].setdefault("races_won", {})
+        users[user_id] = UserProfile()
+    return users[user_id]
+
+
+# === User Stat Transactions ===
+class UserStatTransaction:
+    """
+    Unit of work for user stats. Wins, participations and shard changes are
+    staged in memory; commit() applies them all and marks the touched users
+    dirty with a single save_users call.
+    """
+    __slots__ = ("_shards", "_joined", "_won")
+
+    def __init__(self):
+        self._shards = defaultdict(int)
+        self._joined = defaultdict(Counter)
+        self._won = defaultdict(Counter)
+
+    def add_shards(self, user_id, amount):
+        self._shards[str(user_id)] += amount
+
+    def add_participation(self, user_id, randomizer, shards=PARTICIPATION_SHARDS):
+        self._joined[str(user_id)][randomizer] += 1
+        self.add_shards(user_id, shards)
+
+    def add_win(self, user_id, randomizer, shards=WIN_SHARDS):
+        self._won[str(user_id)][randomizer] += 1
+        self.add_shards(user_id, shards)
+
+    def commit(self):
+        """Apply staged changes and persist them once. Returns the touched user ids."""
+        touched = self._shards.keys() | self._joined.keys() | self._won.keys()
+        for user_id in touched:
+            profile = ensure_user_exists(user_id)
+            profile.crystal_shards += self._shards.get(user_id, 0)
+            for randomizer, count in self._joined.get(user_id, {}).items():
+                profile.races_joined[randomizer] = profile.races_joined.get(randomizer, 0) + count
+            for randomizer, count in self._won.get(user_id, {}).items():
+                profile.races_won[randomizer] = profile.races_won.get(randomizer, 0) + count
+        if touched:
+            save_users(*touched)
+        self._shards.clear()
+        self._joined.clear()
+        self._won.clear()
+        return touched
+
+
+@contextmanager
+def user_stat_transaction():
+    """Stage user stat changes; they are committed together on exit (discarded on error)."""
+    transaction = UserStatTransaction()
+    yield transaction
+    transaction.commit()
 
 
 def award_crystal_shards(user_id, randomizer):
-    ensure_user_exists(user_id)
-    user_id = str(user_id)
-    users[user_id]["races_won"][randomizer] = users[user_id]["races_won"].get(randomizer, 0) + 1
-    users[user_id]["crystal_shards"] += 10
-    save_users()
+    with user_stat_transaction() as transaction:
+        transaction.add_win(user_id, randomizer)
 
 
 def increment_participation(user_id, randomizer):
-    ensure_user_exists(user_id)
-    user_id = str(user_id)
-    users[user_id]["races_joined"][randomizer] = users[user_id]["races_joined"].get(randomizer, 0) + 1
-    users[user_id]["crystal_shards"] += 2
-    save_users()
+    with user_stat_transaction() as transaction:
+        transaction.add_participation(user_id, randomizer)
 
 
 # === Cleanup Timer Trigger (Persistent) ===
@@ -140,151 +534,220 @@ def start_cleanup_timer(channel_id, delay=600):
         # Mark cleanup pending (for compatibility / visibility)
         race["cleanup_pending"] = True
         race["cleanup_scheduled_for"] = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
-        save_races()
-    # NOTE: actual deletion is driven by the reap loop (or startup sweep)
+        index_race(channel_id)
+        save_races(channel_id)
+        schedule_cleanup(channel_id)
+    # NOTE: actual deletion is driven by the cleanup scheduler
+
+
+# === Cleanup Deadline Scheduler ===
+# Min-heap of (due timestamp, channel_id). _cleanup_due holds each race's current
+# deadline; heap entries that no longer match it are stale and skipped. The
+# scheduler sleeps exactly until the earliest deadline or until woken because
+# an earlier one was added.
+def _cleanup_eligible(race):
+    if race.get("race_type") == "live":
+        return race.get("live_finished", False)  # set in finalize_race
+    if race.get("race_type") == "async":
+        return race.get("finishasync_used", False)
+    return False
+
+
+def _cleanup_deadline(channel_id, race):
+    """Due time (epoch seconds) for an eligible race, or None if it isn't due for cleanup."""
+    if not _cleanup_eligible(race):
+        return None
+    candidates = []
+    last = last_activity.get(channel_id)
+    if isinstance(last, str):
+        try:
+            last = datetime.fromisoformat(last)
+        except Exception:
+            last = None
+    if isinstance(last, datetime):
+        candidates.append(last.timestamp() + CLEANUP_THRESHOLD_SECONDS)
+    scheduled_for = race.get("cleanup_scheduled_for")
+    if scheduled_for:
+        try:
+            candidates.append(datetime.fromisoformat(scheduled_for).timestamp())
+        except Exception:
+            pass
+    return max(candidates) if candidates else None
 
 
-# === Reaper Loop ===
-@tasks.loop(seconds=30)
-async def _reap_inactive_races():
-    global _bot_ref
-    if not _bot_ref:
+def schedule_cleanup(channel_id):
+    """(Re)compute a race's cleanup deadline and wake the scheduler if it moved earlier."""
+    channel_id = str(channel_id)
+    race = races.get(channel_id)
+    due = _cleanup_deadline(channel_id, race) if race else None
+    if due is None:
+        _cleanup_due.pop(channel_id, None)
         return
-    now = datetime.now(timezone.utc)
-    for channel_id, race in list(races.items()):
-        try:
-            # Always ensure channel_id is string
-            cid = str(channel_id)
-            last = last_activity.get(cid)
-            if not last:
-                continue
-            # Normalize last to datetime
-            if isinstance(last, str):
-                try:
-                    last_dt = datetime.fromisoformat(last)
-                except Exception:
-                    continue
-            elif isinstance(last, datetime):
-                last_dt = last
-            else:
-                continue
+    previous = _cleanup_due.get(channel_id)
+    if previous == due:
+        return
+    _cleanup_due[channel_id] = due
+    heapq.heappush(_cleanup_heap, (due, channel_id))
+    if _cleanup_wakeup is not None and _cleanup_heap[0][0] == due:
+        _cleanup_wakeup.set()  # new earliest deadline
+
+
+async def _run_cleanup_scheduler():
+    global _cleanup_wakeup
+    _cleanup_wakeup = asyncio.Event()
+    while True:
+        # Drop entries superseded by a later reschedule or a removed race
+        while _cleanup_heap and _cleanup_due.get(_cleanup_heap[0][1]) != _cleanup_heap[0][0]:
+            heapq.heappop(_cleanup_heap)
+
+        _cleanup_wakeup.clear()
+        if not _cleanup_heap:
+            await _cleanup_wakeup.wait()
+            continue
 
-            # LIVE races: require live_finished flag (set in finalize_race)
-            if race.get("race_type") == "live" and race.get("live_finished", False):
-                if (now - last_dt).total_seconds() >= CLEANUP_THRESHOLD_SECONDS:
-                    print(f"[DEBUG] Reaper auto-cleanup triggered for live race {cid}")
-                    await cleanup_race(_bot_ref, cid)
-                    continue  # already removed
-
-            # ASYNC races: require finishasync_used
-            if race.get("race_type") == "async" and race.get("finishasync_used", False):
-                if (now - last_dt).total_seconds() >= CLEANUP_THRESHOLD_SECONDS:
-                    print(f"[DEBUG] Reaper auto-cleanup triggered for async race {cid}")
-                    await cleanup_race(_bot_ref, cid)
-                    continue
-        except Exception as e:
-            print(f"[DEBUG] Error in reap loop for channel {channel_id}: {e}")
+        due, channel_id = _cleanup_heap[0]
+        delay = due - datetime.now(timezone.utc).timestamp()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(_cleanup_wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        # Take every race that is due now (e.g. all overdue rooms after an outage) as one batch
+        now = datetime.now(timezone.utc).timestamp()
+        batch = []
+        while _cleanup_heap and _cleanup_heap[0][0] <= now:
+            due, channel_id = heapq.heappop(_cleanup_heap)
+            if _cleanup_due.get(channel_id) == due:
+                _cleanup_due.pop(channel_id, None)
+                batch.append(channel_id)
+        print(f"[DEBUG] Scheduled auto-cleanup triggered for {len(batch)} race(s)")
+        await cleanup_races(_bot_ref, batch)
+        for channel_id in batch:
+            if channel_id in races and channel_id not in _cleanup_due:
+                # Cleanup didn't remove the race (e.g. deletes kept failing); try again later
+                retry_at = datetime.now(timezone.utc).timestamp() + CLEANUP_RETRY_SECONDS
+                _cleanup_due[channel_id] = retry_at
+                heapq.heappush(_cleanup_heap, (retry_at, channel_id))
 
 
 def init_cleanup(bot):
-    """Initialize the background reap loop with the bot context."""
-    global _bot_ref
+    """Initialize the cleanup scheduler with the bot context."""
+    global _bot_ref, _cleanup_task
     _bot_ref = bot
-    if not _reap_inactive_races.is_running():
-        _reap_inactive_races.start()
-    print("[DEBUG] Cleanup reap loop started.")
+    if _cleanup_task is None or _cleanup_task.done():
+        _cleanup_task = asyncio.create_task(_run_cleanup_scheduler())
+    if not _checkpoint_activity.is_running():
+        _checkpoint_activity.start()
+    print("[DEBUG] Cleanup scheduler started.")
 
 
 # === Resume Cleanup on Bot Startup ===
 async def resume_cleanup_on_startup(bot):
-    """On startup, immediately sweep overdue cleanups and start the reap loop."""
+    """On startup, restore cleanup deadlines; overdue races are cleaned up immediately."""
     # Ensure last activity/races are loaded before calling
     init_cleanup(bot)
+    for channel_id in list(races):
+        schedule_cleanup(channel_id)
+    print(f"[DEBUG] Restored {len(_cleanup_due)} pending race cleanups.")
 
-    now = datetime.now(timezone.utc)
-    for channel_id, race in list(races.items()):
-        cid = str(channel_id)
-        last = last_activity.get(cid)
-        if not last:
-            continue
-        if isinstance(last, str):
-            try:
-                last_dt = datetime.fromisoformat(last)
-            except Exception:
-                continue
-        elif isinstance(last, datetime):
-            last_dt = last
-        else:
-            continue
-
-        # LIVE overdue
-        if race.get("race_type") == "live" and race.get("live_finished", False):
-            if (now - last_dt).total_seconds() >= CLEANUP_THRESHOLD_SECONDS:
-                print(f"[DEBUG] Cleanup overdue for live race channel {cid} on startup.")
-                await cleanup_race(bot, cid)
-                continue
 
-        # ASYNC overdue
-        if race.get("race_type") == "async" and race.get("finishasync_used", False):
-            if (now - last_dt).total_seconds() >= CLEANUP_THRESHOLD_SECONDS:
-                print(f"[DEBUG] Cleanup overdue for async race channel {cid} on startup.")
-                await cleanup_race(bot, cid)
-                continue
+# === Cleanup Logic ===
+async def _delete_with_retry(route, factory, priority, label):
+    """
+    Run a delete through the dispatcher, retrying failures with exponential backoff.
+    A 404 counts as success (already gone). Returns True if the object is gone.
+    """
+    for attempt in range(1, CLEANUP_DELETE_ATTEMPTS + 1):
+        try:
+            await submit(route, factory, priority, label=label)
+            return True
+        except discord.NotFound:
+            return True
+        except Exception as e:
+            if attempt == CLEANUP_DELETE_ATTEMPTS:
+                print(f"❌ Failed to {label} after {attempt} attempts: {e}")
+                return False
+            await asyncio.sleep(CLEANUP_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return False
 
 
-# === Cleanup Logic ===
 async def cleanup_race(bot, channel_id):
-    """Delete race and spoiler channels, announcement message, and remove race entry."""
+    """
+    Delete race and spoiler channels, access roles and the announcement message, then
+    remove the race entry. Deletes run concurrently on partial objects (no fetch first).
+    Returns True if the race was removed; False leaves it for a later retry.
+    """
     channel_id = str(channel_id)
     race = races.get(channel_id)
     if not race:
-        return
+        return True
 
-    guild = None
-    # Try to find the guild: prefer stored guild_id
-    guild_id = race.get("guild_id")
-    if guild_id:
-        guild = next((g for g in bot.guilds if g.id == guild_id), None)
-    if not guild and bot.guilds:
-        guild = bot.guilds[0]  # fallback to first
+    # Stop any seed still being rolled for this room
+    cancel_seed_generation(channel_id)
 
-    if not guild:
-        print(f"[DEBUG] Unable to locate guild for cleanup of {channel_id}")
-        return
-
-    # Delete race channel
-    try:
-        race_channel = guild.get_channel(int(channel_id))
-        if race_channel:
-            await race_channel.delete()
-    except Exception as e:
-        print(f"❌ Failed to delete race channel {channel_id}: {e}")
-
-    # Delete spoilers channel
+    reason = f"Race room {channel_id} cleanup"
+    # Race/spoiler channels must be gone before the race entry is dropped
+    channel_deletes = [_delete_with_retry(
+        channel_route(channel_id), lambda: bot.http.delete_channel(int(channel_id), reason=reason),
+        PRIORITY_NORMAL, f"delete race channel {channel_id}"
+    )]
     spoilers_id = race.get("spoilers_channel_id")
     if spoilers_id:
-        try:
-            spoilers_channel = guild.get_channel(spoilers_id)
-            if spoilers_channel:
-                await spoilers_channel.delete()
-        except Exception as e:
-            print(f"❌ Failed to delete spoilers channel {spoilers_id}: {e}")
+        channel_deletes.append(_delete_with_retry(
+            channel_route(spoilers_id), lambda: bot.http.delete_channel(spoilers_id, reason=reason),
+            PRIORITY_NORMAL, f"delete spoilers channel {spoilers_id}"
+        ))
 
-    # Delete announcement message
+    # Access roles (role-based access mode) and the announcement are best effort
+    other_deletes = []
+    guild_id = race.get("guild_id")
+    for key in ("race_role_id", "spoiler_role_id"):
+        role_id = race.get(key)
+        if role_id and guild_id:
+            other_deletes.append(_delete_with_retry(
+                guild_route(guild_id, "roles"), lambda role_id=role_id: bot.http.delete_role(guild_id, role_id, reason=reason),
+                PRIORITY_NORMAL, f"delete role {role_id}"
+            ))
     ann_channel_id = race.get("announcement_channel_id")
     ann_message_id = race.get("announcement_message_id")
     if ann_channel_id and ann_message_id:
-        try:
-            ann_channel = guild.get_channel(ann_channel_id)
-            if ann_channel:
-                ann_msg = await ann_channel.fetch_message(ann_message_id)
-                await ann_msg.delete()
-        except Exception as e:
-            print(f"❌ Failed to delete announcement message {ann_message_id}: {e}")
+        announcement = bot.get_partial_messageable(ann_channel_id).get_partial_message(ann_message_id)
+        other_deletes.append(_delete_with_retry(
+            channel_route(ann_channel_id), announcement.delete,
+            PRIORITY_COSMETIC, f"delete announcement {ann_message_id}"
+        ))
+
+    outcomes = await asyncio.gather(*channel_deletes, *other_deletes)
+    if not all(outcomes[:len(channel_deletes)]):
+        return False
 
     # Remove race data
     races.pop(channel_id, None)
     last_activity.pop(channel_id, None)
-    save_races()
-    save_last_activity()
+    _cleanup_due.pop(channel_id, None)
+    record_race_event("cleanup", channel_id)
+    save_last_activity(channel_id)
     print(f"🧹 Cleaned up race room {channel_id} and associated spoilers room.")
+    return True
+
+
+async def cleanup_races(bot, channel_ids):
+    """Clean up many race rooms with at most CLEANUP_CONCURRENCY in flight; prints a summary."""
+    semaphore = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+    async def run(channel_id):
+        async with semaphore:
+            try:
+                return await cleanup_race(bot, channel_id)
+            except Exception as e:
+                print(f"[DEBUG] Error cleaning up race {channel_id}: {e}")
+                return False
+
+    channel_ids = list(channel_ids)
+    outcomes = await asyncio.gather(*(run(cid) for cid in channel_ids))
+    failed = [cid for cid, ok in zip(channel_ids, outcomes) if not ok]
+    print(f"🧹 Cleanup batch: {len(channel_ids) - len(failed)} cleaned, {len(failed)} failed"
+          + (f" (will retry: {', '.join(failed)})" if failed else "") + ".")
+    return failed
@@ -0,0 +1,104 @@
+from enum import Enum
+from bot_config import TIME_DISPLAY_PRECISION
+from models import Runner
+
+# === Race time codec ===
+# Finish times are integer milliseconds stored on the runner entry
+# (runners[uid] = Runner(status="done", finish_ms=307000)). Strings only exist
+# at the edges: parse_duration for user input, format_duration for display.
+# Older race files stored async times as "H:MM:SS" strings in results and as
+# whole seconds in finish_time; finish_ms() still reads both.
+
+
+class Status(str, Enum):
+    RUNNING = "running"
+    DONE = "done"
+    FORFEIT = "forfeit"
+
+
+FINAL_STATUSES = (Status.DONE, Status.FORFEIT)
+
+_STATUS_ALIASES = {"done": Status.DONE, "forfeit": Status.FORFEIT, "ff": Status.FORFEIT}
+
+
+def runner_status(runner) -> Status:
+    """Status of a runner entry; legacy "ff" maps to FORFEIT, anything unknown to RUNNING."""
+    return _STATUS_ALIASES.get((runner or {}).get("status"), Status.RUNNING)
+
+
+def parse_duration(text: str):
+    """
+    Accepts S, M:SS, or H:MM:SS (minutes/seconds 0-59) and returns milliseconds,
+    or None if invalid.
+    """
+    try:
+        nums = [int(p) for p in str(text).strip().split(":")]
+    except ValueError:
+        return None
+    if not nums or len(nums) > 3 or any(n < 0 for n in nums):
+        return None
+    if any(n >= 60 for n in nums[-2:]) and len(nums) > 1:
+        return None
+    seconds = 0
+    for n in nums:
+        seconds = seconds * 60 + n
+    return seconds * 1000
+
+
+def format_duration(ms: int, precision: int = None) -> str:
+    """H:MM:SS plus `precision` fractional digits (0-3, default TIME_DISPLAY_PRECISION), truncated."""
+    precision = TIME_DISPLAY_PRECISION if precision is None else precision
+    precision = max(0, min(3, precision))
+    total_seconds, millis = divmod(max(0, int(ms)), 1000)
+    h, rem = divmod(total_seconds, 3600)
+    m, s = divmod(rem, 60)
+    text = f"{h}:{m:02}:{s:02}"
+    if precision:
+        text += f".{millis:03}"[:precision + 1]
+    return text
+
+
+def display_precision(race) -> int:
+    """Async times are submitted in whole seconds, so they are shown without a fraction."""
+    return 0 if race.get("race_type") == "async" else TIME_DISPLAY_PRECISION
+
+
+def finish_ms(race, user_id):
+    """A runner's finish time in ms, or None if they have not finished with a time."""
+    user_key = str(user_id)
+    runner = race.get("runners", {}).get(user_key, {})
+    if runner.get("finish_ms") is not None:
+        return runner["finish_ms"]
+    if runner.get("finish_time") is not None:  # legacy: whole seconds
+        return int(runner["finish_time"]) * 1000
+    legacy = race.get("results", {}).get(user_key, {}).get("time")
+    if legacy and legacy != "FF":
+        return parse_duration(legacy)
+    return None
+
+
+def set_finished(race, user_id, ms: int):
+    race.setdefault("runners", {})[str(user_id)] = Runner(status=Status.DONE.value, finish_ms=int(ms))
+    race.get("results", {}).pop(str(user_id), None)
+
+
+def set_forfeit(race, user_id):
+    race.setdefault("runners", {})[str(user_id)] = Runner(status=Status.FORFEIT.value)
+    race.get("results", {}).pop(str(user_id), None)
+
+
+def clear_finish(race, user_id):
+    race.get("runners", {}).pop(str(user_id), None)
+    race.get("results", {}).pop(str(user_id), None)
+
+
+def ranked_finishers(race):
+    """[(user_id_str, ms), ...] for every runner that finished with a time, fastest first."""
+    finishers = []
+    for user_key, runner in race.get("runners", {}).items():
+        if runner_status(runner) is Status.DONE:
+            ms = finish_ms(race, user_key)
+            if ms is not None:
+                finishers.append((user_key, ms))
+    finishers.sort(key=lambda f: f[1])
+    return finishers
@@ -0,0 +1,52 @@
+import asyncio
+import aiohttp
+from bot_config import SEED_UPSTREAM_CONCURRENCY, SEED_REQUEST_TIMEOUT_SECONDS
+
+# === Shared asyncio HTTP client for seed APIs ===
+# One keep-alive session per upstream, plus a semaphore that caps how many
+# generate/poll sequences run against that upstream at once.
+
+USER_AGENT = "DiscordBot"
+
+_sessions = {}
+_limits = {}
+
+
+def _session(upstream: str) -> aiohttp.ClientSession:
+    session = _sessions.get(upstream)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=SEED_UPSTREAM_CONCURRENCY * 2, keepalive_timeout=60)
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=SEED_REQUEST_TIMEOUT_SECONDS)
+        )
+        _sessions[upstream] = session
+    return session
+
+
+def limit(upstream: str) -> asyncio.Semaphore:
+    """Concurrency limit for one upstream (use as `async with limit(...)`)."""
+    sem = _limits.get(upstream)
+    if sem is None:
+        sem = asyncio.Semaphore(SEED_UPSTREAM_CONCURRENCY)
+        _limits[upstream] = sem
+    return sem
+
+
+async def get_json(upstream: str, url: str) -> dict:
+    async with _session(upstream).get(url) as resp:
+        return await resp.json(content_type=None)
+
+
+async def post_json(upstream: str, url: str, payload: dict) -> dict:
+    async with _session(upstream).post(url, json=payload) as resp:
+        return await resp.json(content_type=None)
+
+
+async def close_sessions():
+    """Close all upstream sessions (call on shutdown)."""
+    for session in _sessions.values():
+        if not session.closed:
+            await session.close()
+    _sessions.clear()
@@ -1,17 +1,12 @@
-import json
-import os
 import random
 import time
 import requests
-from bot_config import PRESET_FILES, API_KEY, FF6WC_API_KEY
+from bot_config import API_KEY, FF6WC_API_KEY
+from utils.preset_store import get_presets
 
 def load_presets_for(randomizer):
     """Load preset flagsets for a given randomizer."""
-    file_path = PRESET_FILES.get(randomizer)
-    if file_path and os.path.isfile(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
-    return {}
+    return get_presets(randomizer)
 
 def generate_manual_seed(randomizer):
     """Placeholder for randomizers that don't have API endpoints."""
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import persistence
+from bot_config import SEED_POOL_FILE, SEED_POOL_SIZE, SEED_POOL_SIZES, SEED_POOL_REFILL_CONCURRENCY
+from utils.seeds import generate_seed, load_presets_for
+
+# === Pre-rolled seed pool ===
+# Keeps up to N unused seeds per (randomizer, preset) so /rollseed can answer
+# instantly. Taking a seed starts a background refill. Refills share the
+# upstream limits with /rollseed, so they also take one of a few refill slots
+# (SEED_POOL_REFILL_CONCURRENCY): at startup every preset queues for a slot
+# instead of flooding the upstream. The pool is persisted through the
+# write-behind layer so it survives restarts.
+
+POOLED_RANDOMIZERS = ("FF4FE", "FF6WC")  # randomizers whose seeds are slow to generate
+REFILL_RETRY_SECONDS = 60
+
+_pool = {}  # "RANDOMIZER:preset" -> [seed_url, ...]
+_refilling = {}  # same key -> refill task
+_loaded = False
+_refill_slots = None
+
+
+def _key(randomizer: str, preset: str) -> str:
+    return f"{randomizer}:{preset}"
+
+
+def pool_size(randomizer: str, preset: str) -> int:
+    """Target size for a preset: exact override, then "RANDOMIZER:*", then SEED_POOL_SIZE."""
+    return SEED_POOL_SIZES.get(
+        _key(randomizer, preset),
+        SEED_POOL_SIZES.get(_key(randomizer, "*"), SEED_POOL_SIZE)
+    )
+
+
+def _snapshot_pool():
+    return SEED_POOL_FILE, json.dumps(_pool, indent=2)
+
+
+def _write_pool(payload):
+    path, text = payload
+    if path:
+        persistence.write_text_atomic(path, text)
+
+
+persistence.register_store("seed_pool", _snapshot_pool, _write_pool)
+
+
+def load_pool():
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if SEED_POOL_FILE and os.path.exists(SEED_POOL_FILE):
+        with open(SEED_POOL_FILE, "r") as f:
+            _pool.update(json.load(f))
+
+
+def take_pooled_seed(randomizer: str, preset: str):
+    """Pop a pre-rolled seed for this preset (or None) and schedule a refill."""
+    seeds = _pool.get(_key(randomizer, preset))
+    seed_url = seeds.pop(0) if seeds else None
+    if seed_url:
+        persistence.mark_dirty("seed_pool")
+        print(f"[DEBUG] Served {randomizer} '{preset}' seed from pool ({len(seeds)} left).")
+    schedule_refill(randomizer, preset)
+    return seed_url
+
+
+def _refill_limit() -> asyncio.Semaphore:
+    global _refill_slots
+    if _refill_slots is None:
+        _refill_slots = asyncio.Semaphore(max(1, SEED_POOL_REFILL_CONCURRENCY))
+    return _refill_slots
+
+
+def schedule_refill(randomizer: str, preset: str):
+    if randomizer not in POOLED_RANDOMIZERS or pool_size(randomizer, preset) <= 0:
+        return
+    key = _key(randomizer, preset)
+    task = _refilling.get(key)
+    if task and not task.done():
+        return
+    _refilling[key] = asyncio.create_task(_refill(randomizer, preset))
+
+
+async def _refill(randomizer: str, preset: str):
+    key = _key(randomizer, preset)
+    while len(_pool.get(key, [])) < pool_size(randomizer, preset):
+        if preset not in load_presets_for(randomizer):
+            return  # preset was removed
+        async with _refill_limit():
+            seed_url = await generate_seed(randomizer, preset, shared=False)  # pooled seeds must be distinct
+        if not seed_url:
+            print(f"[WARN] Seed pool refill for {key} failed; retrying in {REFILL_RETRY_SECONDS}s.")
+            await asyncio.sleep(REFILL_RETRY_SECONDS)
+            continue
+        _pool.setdefault(key, []).append(seed_url)
+        persistence.mark_dirty("seed_pool")
+
+
+def start_seed_pool():
+    """Load the persisted pool and start refilling every configured preset."""
+    load_pool()
+    for randomizer in POOLED_RANDOMIZERS:
+        for preset in load_presets_for(randomizer):
+            schedule_refill(randomizer, preset)
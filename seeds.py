@@ -1,93 +1,219 @@
-import json
-import os
+import asyncio
 import random
-import requests
 import time
+from collections import OrderedDict
 from bot_config import (
-    FF4FE_PRESETS_FILE,
-    FF1R_PRESETS_FILE,
-    FF5CD_PRESETS_FILE,
-    FFMQR_PRESETS_FILE,
-    FF6WC_PRESETS_FILE,
     FF4FE_API_KEY,
-    FF6WC_API_KEY
+    FF6WC_API_KEY,
+    SEED_DEADLINE_SECONDS,
+    SEED_POLL_FIRST_DELAY_SECONDS,
+    SEED_POLL_MAX_DELAY_SECONDS,
+    SEED_POLL_BUDGET_SECONDS,
+    SEED_CACHE_SIZE,
+    SEED_CACHE_TTL_SECONDS
 )
+from utils.seed_client import get_json, post_json, limit
+from utils.preset_store import get_presets
+
+# === In-flight generations per race room (for cancellation) ===
+_inflight_by_channel = {}
+
+# === Single-flight + LRU cache keyed on (room, randomizer, canonical flags) ===
+# Sharing is scoped to one race room so different races never get the same seed.
+_flights = {}  # key -> {"task": Task, "waiters": int, "listeners": [on_progress], "state": str}
+_seed_cache = OrderedDict()  # key -> (seed_url, expires_at)
 
 # === Load Presets From JSON Files ===
 def load_presets_for(randomizer: str):
-    """Load presets for the given randomizer from its JSON file defined in .env."""
-    file_map = {
-        "FF4FE": FF4FE_PRESETS_FILE,
-        "FF1R": FF1R_PRESETS_FILE,
-        "FF5CD": FF5CD_PRESETS_FILE,
-        "FFMQR": FFMQR_PRESETS_FILE,
-        "FF6WC": FF6WC_PRESETS_FILE
-    }
-    file_path = file_map.get(randomizer)
-    if not file_path or not os.path.exists(file_path):
-        return {}
-    with open(file_path, "r") as f:
-        return json.load(f)
+    """Presets for the given randomizer (cached; re-read only when the file changes)."""
+    return get_presets(randomizer)
+
+# === Adaptive Status Polling ===
+async def _report(on_progress, state: str):
+    """Send a progress state ("queued" / "generating" / "done") to the optional callback."""
+    if on_progress is None:
+        return
+    try:
+        await on_progress(state)
+    except Exception as e:
+        print(f"[DEBUG] Seed progress callback failed: {e}")
+
+
+async def _poll_until_done(upstream: str, url: str, on_progress=None):
+    """
+    Poll a task/status URL until it reports "done". The first probe is fast,
+    then the delay doubles (with jitter) up to SEED_POLL_MAX_DELAY_SECONDS,
+    within a total budget of SEED_POLL_BUDGET_SECONDS.
+    Returns the final status payload, or None on failure or when the budget runs out.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SEED_POLL_BUDGET_SECONDS
+    delay = SEED_POLL_FIRST_DELAY_SECONDS
+    reported = False
+    while True:
+        await asyncio.sleep(delay)
+        data = await get_json(upstream, url)
+        status = data.get("status")
+        if status == "done":
+            return data
+        if status in ("error", "failed"):
+            print(f"❌ {upstream} seed task failed: {data}")
+            return None
+        if not reported:
+            await _report(on_progress, "generating")
+            reported = True
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            print(f"❌ {upstream} seed not ready after {SEED_POLL_BUDGET_SECONDS}s; giving up.")
+            return None
+        delay = min(delay * 2, SEED_POLL_MAX_DELAY_SECONDS) * random.uniform(0.8, 1.2)
+        delay = min(delay, remaining)
+
+# === Single-flight Deduplication ===
+def _resolve_flags(randomizer: str, preset_or_flags: str) -> str:
+    custom_presets = load_presets_for(randomizer)
+    return custom_presets.get(preset_or_flags, preset_or_flags or random.choice(list(custom_presets.values())))
+
+
+def _canonical_flags(flags: str) -> str:
+    return " ".join(str(flags).split())
+
+
+def _cache_get(key):
+    entry = _seed_cache.get(key)
+    if not entry:
+        return None
+    seed_url, expires_at = entry
+    if expires_at < time.monotonic():
+        _seed_cache.pop(key, None)
+        return None
+    _seed_cache.move_to_end(key)
+    return seed_url
+
+
+def _cache_put(key, seed_url):
+    if SEED_CACHE_SIZE <= 0 or SEED_CACHE_TTL_SECONDS <= 0:
+        return
+    _seed_cache[key] = (seed_url, time.monotonic() + SEED_CACHE_TTL_SECONDS)
+    _seed_cache.move_to_end(key)
+    while len(_seed_cache) > SEED_CACHE_SIZE:
+        _seed_cache.popitem(last=False)
+
+
+def _finish_flight(key, task):
+    _flights.pop(key, None)
+    if not task.cancelled() and task.exception() is None and task.result():
+        _cache_put(key, task.result())
+
+
+async def _fan_out(flight, state: str):
+    """Progress callback of a shared roll: forwards each state to every waiter."""
+    flight["state"] = state
+    for listener in list(flight["listeners"]):
+        await _report(listener, state)
+
+
+async def _single_flight(randomizer: str, flags: str, roll, on_progress=None, shared=True, scope=None) -> str:
+    """
+    Run roll(flags, on_progress) once per (scope, randomizer, canonical flags):
+    concurrent identical requests from the same scope (race room) await the same
+    upstream sequence and all receive its progress, and recent results are served
+    from a bounded LRU cache. shared=False always rolls a fresh seed.
+    """
+    if not shared:
+        return await roll(flags, on_progress)
+    key = (scope, randomizer, _canonical_flags(flags))
+    cached = _cache_get(key)
+    if cached:
+        print(f"[DEBUG] {randomizer} seed served from cache.")
+        return cached
+
+    flight = _flights.get(key)
+    if flight is None:
+        flight = _flights[key] = {"task": None, "waiters": 0, "listeners": [], "state": None}
+        task = flight["task"] = asyncio.ensure_future(roll(flags, lambda state: _fan_out(flight, state)))
+        task.add_done_callback(lambda t: _finish_flight(key, t))
+    else:
+        print(f"[DEBUG] Joining in-flight {randomizer} generation for identical flags.")
+        if flight["state"]:
+            await _report(on_progress, flight["state"])
+
+    flight["waiters"] += 1
+    if on_progress is not None:
+        flight["listeners"].append(on_progress)
+    try:
+        return await asyncio.shield(flight["task"])
+    except asyncio.CancelledError:
+        if flight["waiters"] == 1:
+            flight["task"].cancel()  # nobody else is waiting on this upstream sequence
+        raise
+    finally:
+        flight["waiters"] -= 1
+        if on_progress is not None:
+            flight["listeners"].remove(on_progress)
 
 # === FF4FE Seed Generation ===
-def generate_ff4fe_seed(preset_or_flags: str) -> str:
-    custom_presets = load_presets_for("FF4FE")
-    flags = custom_presets.get(preset_or_flags, preset_or_flags or random.choice(list(custom_presets.values())))
+async def _ff4fe_seed_url(seed_id) -> str:
+    seed_data = await get_json(
+        "ff4fe", f"https://ff4fe.galeswift.com/api/seed?key={FF4FE_API_KEY}&id={seed_id}"
+    )
+    return seed_data.get("url")
+
+
+async def generate_ff4fe_seed(preset_or_flags: str, on_progress=None, shared=True, scope=None) -> str:
+    flags = _resolve_flags("FF4FE", preset_or_flags)
+    return await _single_flight("FF4FE", flags, _roll_ff4fe_seed, on_progress, shared, scope)
+
+
+async def _roll_ff4fe_seed(flags: str, on_progress=None) -> str:
     try:
-        gen_resp = requests.post(
-            f"https://ff4fe.galeswift.com/api/generate?key={FF4FE_API_KEY}",
-            json={"flags": flags}, headers={"User-Agent": "DiscordBot"}, timeout=10
-        )
-        gen_data = gen_resp.json()
-
-        if gen_data.get("status") == "ok":
-            task_id = gen_data.get("task_id")
-            for _ in range(20):
-                time.sleep(3)  # increased from 1.5 to 3
-                task_data = requests.get(
-                    f"https://ff4fe.galeswift.com/api/task?key={FF4FE_API_KEY}&id={task_id}",
-                    headers={"User-Agent": "DiscordBot"}
-                ).json()
-                if task_data.get("status") == "done":
-                    seed_id = task_data.get("seed_id")
-                    return requests.get(
-                        f"https://ff4fe.galeswift.com/api/seed?key={FF4FE_API_KEY}&id={seed_id}",
-                        headers={"User-Agent": "DiscordBot"}
-                    ).json().get("url")
-
-        elif gen_data.get("status") == "exists":
-            seed_id = gen_data.get("seed_id")
-            return requests.get(
-                f"https://ff4fe.galeswift.com/api/seed?key={FF4FE_API_KEY}&id={seed_id}",
-                headers={"User-Agent": "DiscordBot"}
-            ).json().get("url")
+        await _report(on_progress, "queued")
+        async with limit("ff4fe"):
+            gen_data = await post_json(
+                "ff4fe", f"https://ff4fe.galeswift.com/api/generate?key={FF4FE_API_KEY}", {"flags": flags}
+            )
+
+            if gen_data.get("status") == "ok":
+                task_id = gen_data.get("task_id")
+                task_data = await _poll_until_done(
+                    "ff4fe", f"https://ff4fe.galeswift.com/api/task?key={FF4FE_API_KEY}&id={task_id}", on_progress
+                )
+                if task_data:
+                    return await _ff4fe_seed_url(task_data.get("seed_id"))
 
+            elif gen_data.get("status") == "exists":
+                return await _ff4fe_seed_url(gen_data.get("seed_id"))
+
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"❌ FF4FE seed error: {e}")
     return None
 
 # === FF6WC Seed Generation ===
-def generate_ff6wc_seed(preset_or_flags: str) -> str:
-    custom_presets = load_presets_for("FF6WC")
-    flags = custom_presets.get(preset_or_flags, preset_or_flags or random.choice(list(custom_presets.values())))
+async def generate_ff6wc_seed(preset_or_flags: str, on_progress=None, shared=True, scope=None) -> str:
+    flags = _resolve_flags("FF6WC", preset_or_flags)
+    return await _single_flight("FF6WC", flags, _roll_ff6wc_seed, on_progress, shared, scope)
+
+
+async def _roll_ff6wc_seed(flags: str, on_progress=None) -> str:
     try:
-        gen_resp = requests.post(
-            f"https://ff6worldscollide.com/api/seed/create?key={FF6WC_API_KEY}",
-            json={"flags": flags}, headers={"User-Agent": "DiscordBot"}, timeout=10
-        )
-        gen_data = gen_resp.json()
-        if gen_data.get("status") == "ok":
-            seed_id = gen_data.get("seed_id")
-            for _ in range(20):
-                time.sleep(3)  # increased from 1.5 to 3
-                status_data = requests.get(
-                    f"https://ff6worldscollide.com/api/seed/status?key={FF6WC_API_KEY}&id={seed_id}",
-                    headers={"User-Agent": "DiscordBot"}
-                ).json()
-                if status_data.get("status") == "done":
+        await _report(on_progress, "queued")
+        async with limit("ff6wc"):
+            gen_data = await post_json(
+                "ff6wc", f"https://ff6worldscollide.com/api/seed/create?key={FF6WC_API_KEY}", {"flags": flags}
+            )
+            if gen_data.get("status") == "ok":
+                seed_id = gen_data.get("seed_id")
+                status_data = await _poll_until_done(
+                    "ff6wc", f"https://ff6worldscollide.com/api/seed/status?key={FF6WC_API_KEY}&id={seed_id}", on_progress
+                )
+                if status_data:
                     return f"https://ff6worldscollide.com/seed/{seed_id}"
-        elif gen_data.get("status") == "exists":
-            return f"https://ff6worldscollide.com/seed/{gen_data.get('seed_id')}"
+            elif gen_data.get("status") == "exists":
+                return f"https://ff6worldscollide.com/seed/{gen_data.get('seed_id')}"
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"❌ FF6WC seed error: {e}")
     return None
@@ -102,11 +228,11 @@ def generate_url_seed(randomizer: str, preset_name: str, base_url: str) -> str:
     return f"{base_url}?s={seed_hash}&f={flagset}"
 
 # === Dispatcher ===
-def generate_seed(randomizer: str, preset_or_flags: str) -> str:
+async def _generate_seed(randomizer: str, preset_or_flags: str, on_progress=None, shared=True, scope=None) -> str:
     if randomizer == "FF4FE":
-        return generate_ff4fe_seed(preset_or_flags)
+        return await generate_ff4fe_seed(preset_or_flags, on_progress, shared, scope)
     elif randomizer == "FF6WC":
-        return generate_ff6wc_seed(preset_or_flags)
+        return await generate_ff6wc_seed(preset_or_flags, on_progress, shared, scope)
     elif randomizer == "FFMQR":
         return generate_url_seed("FFMQR", preset_or_flags, "https://www.ffmqrando.net/")
     elif randomizer == "FF1R":
@@ -114,3 +240,48 @@ def generate_seed(randomizer: str, preset_or_flags: str) -> str:
     elif randomizer == "FF5CD":
         return None
     return f"https://placeholder.seed.url/{randomizer}/{preset_or_flags}"
+
+
+async def generate_seed(randomizer: str, preset_or_flags: str, channel_id=None, on_progress=None, shared=True) -> str:
+    """
+    Generate a seed within SEED_DEADLINE_SECONDS. When channel_id is given the
+    generation can be cancelled with cancel_seed_generation (e.g. room deleted).
+    on_progress is an optional coroutine called with "queued", "generating" and "done".
+    Identical concurrent rolls are merged only within the same channel_id;
+    shared=False skips single-flight merging and the cache (always a fresh seed).
+    Returns None on failure, timeout or cancellation.
+    """
+    key = str(channel_id) if channel_id is not None else None
+    task = asyncio.ensure_future(
+        asyncio.wait_for(_generate_seed(randomizer, preset_or_flags, on_progress, shared, key), SEED_DEADLINE_SECONDS)
+    )
+    if key:
+        _inflight_by_channel.setdefault(key, set()).add(task)
+    try:
+        seed_url = await asyncio.shield(task)
+        if seed_url:
+            await _report(on_progress, "done")
+        return seed_url
+    except asyncio.TimeoutError:
+        print(f"❌ {randomizer} seed generation exceeded {SEED_DEADLINE_SECONDS}s deadline.")
+    except asyncio.CancelledError:
+        if not task.cancelled():
+            task.cancel()  # the caller itself was cancelled
+            raise
+        print(f"[DEBUG] {randomizer} seed generation cancelled for channel {key}.")
+    finally:
+        if key:
+            pending = _inflight_by_channel.get(key)
+            if pending is not None:
+                pending.discard(task)
+                if not pending:
+                    _inflight_by_channel.pop(key, None)
+    return None
+
+
+def cancel_seed_generation(channel_id) -> int:
+    """Cancel in-flight seed generation for a race room. Returns how many were cancelled."""
+    tasks = _inflight_by_channel.pop(str(channel_id), set())
+    for task in tasks:
+        task.cancel()
+    return len(tasks)
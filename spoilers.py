@@ -1,10 +1,60 @@
+import asyncio
 import discord
 from race_manager import save_races
+from utils.race_times import FINAL_STATUSES, runner_status
+
+
+def finisher_members(guild, race):
+    """Members of the guild whose runner status is done or forfeit."""
+    members = []
+    for user_id, data in race.get("runners", {}).items():
+        if runner_status(data) in FINAL_STATUSES:
+            member = guild.get_member(int(user_id))
+            if member:
+                members.append(member)
+    return members
+
+
+def get_race_role(guild, race, key):
+    """The race's access role stored under key ("race_role_id" / "spoiler_role_id"), or None."""
+    role_id = race.get(key)
+    return guild.get_role(role_id) if role_id else None
+
+
+async def add_role_to_members(role, members):
+    """Assign role to every member that does not already hold it. Returns how many were assigned."""
+    pending = {m.id: m for m in members if isinstance(m, discord.Member) and role not in m.roles}
+    if pending:
+        await asyncio.gather(*(m.add_roles(role) for m in pending.values()))
+    return len(pending)
+
+
+async def apply_view_overwrites(channel, desired):
+    """
+    Diff desired {target: view_channel bool} against channel.overwrites and apply
+    every change in a single channel.edit call. Other permission fields on existing
+    overwrites are preserved. Returns True if an edit was made.
+    """
+    current = channel.overwrites
+    updated = dict(current)
+    changed = False
+    for target, allow in desired.items():
+        existing = current.get(target)
+        if existing is not None and existing.view_channel == allow:
+            continue
+        overwrite = discord.PermissionOverwrite.from_pair(*existing.pair()) if existing else discord.PermissionOverwrite()
+        overwrite.view_channel = allow
+        updated[target] = overwrite
+        changed = True
+    if changed:
+        await channel.edit(overwrites=updated)
+    return changed
 
 async def get_or_create_spoiler_room(guild, race):
     """
     Create or get the spoiler room for a race.
     Locked by default, then grants access to all runners who already finished or forfeited.
+    Races with a spoiler role get a single role overwrite instead of one per member.
     """
 
     # Check if a spoiler room is already linked
@@ -23,9 +73,16 @@ async def get_or_create_spoiler_room(guild, race):
         return existing_channel
 
     # === Create new spoiler channel locked to everyone by default ===
+    # Runners who already finished or forfeited are granted access in the same call
     overwrites = {
         guild.default_role: discord.PermissionOverwrite(view_channel=False)
     }
+    spoiler_role = get_race_role(guild, race, "spoiler_role_id")
+    if spoiler_role:
+        overwrites[spoiler_role] = discord.PermissionOverwrite(view_channel=True)
+    else:
+        for member in finisher_members(guild, race):
+            overwrites[member] = discord.PermissionOverwrite(view_channel=True)
     parent_category = guild.get_channel(race["category_id"])
     spoiler_channel = await guild.create_text_channel(
         spoiler_channel_name,
@@ -33,14 +90,6 @@ async def get_or_create_spoiler_room(guild, race):
         overwrites=overwrites
     )
 
-    # Grant access to all runners who already finished or forfeited
-    runners_data = race.get("runners", {})
-    for user_id, data in runners_data.items():
-        if data.get("status") in ["done", "ff"]:
-            member = guild.get_member(int(user_id))
-            if member:
-                await spoiler_channel.set_permissions(member, view_channel=True)
-
     # Save the spoiler channel id
     race["spoilers_channel_id"] = spoiler_channel.id
     save_races()
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+
+# === SQLite storage engine (optional backend for race_manager) ===
+# Each race, user and activity timestamp is one row. race_manager hands us the
+# in-memory dicts; we diff them against the last text written per row so a
+# flush only touches rows that actually changed.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    channel_id TEXT PRIMARY KEY,
+    race_name  TEXT,
+    guild_id   INTEGER,
+    state      TEXT,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_races_race_name ON races(race_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_races_guild_id ON races(guild_id);
+CREATE INDEX IF NOT EXISTS idx_races_state ON races(state);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data    TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS last_activity (
+    channel_id TEXT PRIMARY KEY,
+    data       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# table -> (key column, extra indexed columns)
+TABLES = {
+    "races": ("channel_id", ("race_name", "guild_id", "state")),
+    "users": ("user_id", ()),
+    "last_activity": ("channel_id", ()),
+}
+
+_conn = None
+_lock = threading.Lock()
+_written = {table: {} for table in TABLES}  # table -> {key: data text last written}
+
+
+def open_db(path):
+    """Open (or create) the database in WAL mode and ensure the schema exists."""
+    global _conn
+    _conn = sqlite3.connect(path, check_same_thread=False)
+    _conn.execute("PRAGMA journal_mode=WAL")
+    _conn.execute("PRAGMA synchronous=NORMAL")
+    _conn.executescript(SCHEMA)
+    _conn.commit()
+
+
+def is_open():
+    return _conn is not None
+
+
+def get_meta(key):
+    with _lock:
+        row = _conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(key, value):
+    with _lock, _conn:
+        _conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def load_table(table):
+    """Return {key: data text} for every row and remember it as already written."""
+    key_col, _ = TABLES[table]
+    with _lock:
+        rows = _conn.execute(f"SELECT {key_col}, data FROM {table}").fetchall()
+    _written[table] = dict(rows)
+    return dict(rows)
+
+
+def diff_rows(table, current, encode, columns=None, keys=None):
+    """
+    Compare current in-memory values against the rows last written.
+    keys limits the comparison to those entries (None = compare everything).
+    Returns (upserts, deletes) ready for write_rows.
+    """
+    written = _written[table]
+    upserts = []
+    deletes = []
+    for key in (current.keys() if keys is None else keys):
+        key = str(key)
+        if key not in current:
+            if key in written:
+                deletes.append(key)
+                del written[key]
+            continue
+        text = encode(current[key])
+        if written.get(key) == text:
+            continue
+        written[key] = text
+        extra = columns(current[key]) if columns else ()
+        upserts.append((key, *extra, text))
+    if keys is None:
+        for key in [k for k in written if k not in current]:
+            deletes.append(key)
+            del written[key]
+    return upserts, deletes
+
+
+def write_rows(table, upserts, deletes):
+    """Apply row upserts/deletes in one transaction (runs in the persistence worker thread)."""
+    key_col, extra_cols = TABLES[table]
+    cols = (key_col, *extra_cols, "data")
+    placeholders = ", ".join("?" for _ in cols)
+    try:
+        with _lock, _conn:
+            if upserts:
+                _conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) VALUES ({placeholders})",
+                    upserts
+                )
+            if deletes:
+                _conn.executemany(f"DELETE FROM {table} WHERE {key_col} = ?", [(k,) for k in deletes])
+    except Exception:
+        # Forget what we think is on disk so the retry rewrites every row
+        _written[table].clear()
+        raise
+
+
+def migrate_rows(table, current, encode, columns=None):
+    """Bulk-insert rows for the one-shot JSON migration."""
+    upserts, _ = diff_rows(table, current, encode, columns)
+    write_rows(table, upserts, [])
+    return len(upserts)
+
+
+def encode_json(value):
+    return json.dumps(value, sort_keys=True)
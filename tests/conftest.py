@@ -0,0 +1,26 @@
+import sys
+import types
+from pathlib import Path
+
+# The bot imports the flat modules in the repository root both directly
+# (race_manager, persistence, ...) and as utils.<module> (seeds, dispatcher,
+# race_times, ...). Mirror that layout so tests import modules the same way.
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+if "utils" not in sys.modules:
+    utils = types.ModuleType("utils")
+    utils.__path__ = [str(ROOT)]
+    sys.modules["utils"] = utils
+
+try:
+    import bot_config  # noqa: F401
+except SyntaxError:
+    # The committed bot_config.py carries a placeholder load_dotenv() path;
+    # tests only need the os.getenv defaults, so load it with the default lookup
+    path = ROOT / "bot_config.py"
+    source = path.read_text().replace("load_dotenv(path to file)", "load_dotenv()")
+    bot_config = types.ModuleType("bot_config")
+    bot_config.__file__ = str(path)
+    exec(compile(source, str(path), "exec"), bot_config.__dict__)
+    sys.modules["bot_config"] = bot_config
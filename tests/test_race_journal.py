@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import race_journal
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    path = tmp_path / "race_journal.jsonl"
+    monkeypatch.setattr(race_journal, "JOURNAL_FILE", None)
+    monkeypatch.setattr(race_journal, "_appended_since_compaction", 0)
+    return path
+
+
+def test_replay_applies_events_in_order(journal):
+    race_journal.configure(str(journal))
+    race_journal.append({"channel_id": "1", "race": {"race_name": "a", "started": False}})
+    race_journal.append({"channel_id": "1", "race": {"race_name": "a", "started": True}})
+    race_journal.append({"channel_id": "2", "race": {"race_name": "b"}})
+    race_journal.append({"channel_id": "2", "race": None})  # cleanup
+
+    races = {"1": {"race_name": "a"}, "3": {"race_name": "c"}}
+    assert race_journal.replay(races) == 4
+    assert races == {"1": {"race_name": "a", "started": True}, "3": {"race_name": "c"}}
+
+
+def test_torn_tail_is_dropped_before_the_next_append(journal):
+    journal.write_text(json.dumps({"channel_id": "1", "race": {"race_name": "a"}}) + "\n" + '{"channel_id": "2", "ra')
+    race_journal.configure(str(journal))
+    race_journal.append({"channel_id": "3", "race": {"race_name": "c"}})
+
+    lines = journal.read_text().splitlines()
+    assert [json.loads(line)["channel_id"] for line in lines] == ["1", "3"]
+    races = {}
+    assert race_journal.replay(races) == 2
+    assert set(races) == {"1", "3"}
+
+
+def test_truncate_before_keeps_newer_events(journal):
+    race_journal.configure(str(journal))
+    race_journal.append({"channel_id": "1", "race": {"race_name": "a"}})
+    offset = race_journal.position()
+    race_journal.append({"channel_id": "2", "race": {"race_name": "b"}})
+
+    race_journal.truncate_before(offset)
+    races = {}
+    assert race_journal.replay(races) == 1
+    assert set(races) == {"2"}
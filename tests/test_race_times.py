@@ -0,0 +1,40 @@
+from models import Race
+from utils.race_times import (
+    Status, runner_status, parse_duration, format_duration, finish_ms, set_finished, set_forfeit, ranked_finishers
+)
+
+
+def test_parse_duration():
+    assert parse_duration("45") == 45000
+    assert parse_duration("2:05") == 125000
+    assert parse_duration("1:02:03") == 3723000
+    for bad in ("", "abc", "1:60", "1:00:60", "-5", "1:2:3:4"):
+        assert parse_duration(bad) is None
+
+
+def test_format_duration_truncates_to_precision():
+    assert format_duration(3723999, 0) == "1:02:03"
+    assert format_duration(3723999, 1) == "1:02:03.9"
+    assert format_duration(3723456, 3) == "1:02:03.456"
+    assert format_duration(-5, 3) == "0:00:00.000"
+
+
+def test_finish_ms_reads_legacy_formats():
+    race = Race(
+        runners={"1": {"status": "done", "finish_ms": 1500}, "2": {"status": "done", "finish_time": 90}},
+        results={"3": {"time": "0:01:05"}, "4": {"time": "FF"}}
+    )
+    assert finish_ms(race, 1) == 1500
+    assert finish_ms(race, 2) == 90000
+    assert finish_ms(race, 3) == 65000
+    assert finish_ms(race, 4) is None
+
+
+def test_ranked_finishers_skips_forfeits():
+    race = Race()
+    set_finished(race, 1, 5000)
+    set_finished(race, 2, 3000)
+    set_forfeit(race, 3)
+    race["runners"]["4"] = {"status": "ff"}  # legacy forfeit spelling
+    assert ranked_finishers(race) == [("2", 3000), ("1", 5000)]
+    assert runner_status(race["runners"]["4"]) is Status.FORFEIT
@@ -0,0 +1,34 @@
+import json
+
+import race_manager
+import race_journal
+import sqlite_store
+
+
+def test_sqlite_migration_of_legacy_json(tmp_path, monkeypatch):
+    # Legacy files hold plain dicts; the migration must not assume decoded Race records
+    races_file = tmp_path / "races.json"
+    users_file = tmp_path / "users.json"
+    races_file.write_text(json.dumps({
+        "111": {"race_name": "ff4fe-ABCD-live", "guild_id": 1, "channel_id": 111, "started": True,
+                "race_type": "live", "joined_users": [5], "runners": {"5": {"status": "done", "finish_ms": 1000}}},
+        "222": {"race_name": "ff6wc-1234-async", "guild_id": 1, "channel_id": 222, "race_type": "async"}
+    }))
+    users_file.write_text(json.dumps({"5": {"crystal_shards": 120, "races_joined": {"FF4FE": 1}}}))
+
+    for name in ("STORAGE_BACKEND", "DATA_FILE", "USERS_FILE", "LAST_ACTIVITY_FILE"):
+        monkeypatch.setattr(race_manager, name, getattr(race_manager, name))
+    monkeypatch.setattr(race_journal, "JOURNAL_FILE", None)
+    monkeypatch.setattr(race_manager, "races", {})
+    monkeypatch.setattr(race_manager, "users", {})
+    race_manager.configure_files(str(races_file), str(users_file), str(tmp_path / "last_activity.json"))
+    race_manager.configure_storage("sqlite", str(tmp_path / "race_data.db"))
+
+    rows = sqlite_store.load_table("races")
+    assert set(rows) == {"111", "222"}
+    race_manager.load_races()
+    race_manager.load_users()
+    assert race_manager.race_state(race_manager.races["111"]) == "started"
+    assert race_manager.race_state(race_manager.races["222"]) == "open"
+    assert race_manager.races["111"].runners["5"].finish_ms == 1000
+    assert race_manager.users["5"].crystal_shards == 120
@@ -1,10 +1,8 @@
 import discord
 from discord import app_commands
-import json
-import os
 
-from race_manager import users, ensure_user_exists, save_users, races, save_races
-from bot_config import PRESET_FILES
+from race_manager import ensure_user_exists, save_users, races, save_races
+from utils.preset_store import add_preset
 from utils.seeds import load_presets_for
 
 def register(bot):
@@ -14,8 +12,7 @@ def register(bot):
         channel_id = str(interaction.channel.id)
         race = races.get(channel_id)
         user_id = str(interaction.user.id)
-        ensure_user_exists(user_id)
-        user_data = users[user_id]
+        user_data = ensure_user_exists(user_id)
 
         # === Validate wager amount ===
         if amount <= 0:
@@ -43,8 +40,7 @@ def register(bot):
 
         # === Participation check (creator or joined) ===
         creator_id = str(race.get("creator_id", ""))
-        joined_users = [str(uid) for uid in race.get("joined_users", [])]
-        if user_id != creator_id and user_id not in joined_users:
+        if user_id != creator_id and interaction.user.id not in race.get("joined_users", ()):
             await interaction.response.send_message(
                 "❌ You are not part of this race (must be race creator or have joined).",
                 ephemeral=True
@@ -59,7 +55,7 @@ def register(bot):
         total_new_wager = current_wager + amount
 
         # === Check shard balance ===
-        available_shards = user_data.get("crystal_shards", 0)
+        available_shards = user_data.crystal_shards
         if total_new_wager > available_shards + current_wager:
             await interaction.response.send_message(
                 f"❌ Not enough shards (Available: {available_shards}).",
@@ -68,14 +64,14 @@ def register(bot):
             return
 
         # === Deduct and record wager ===
-        user_data["crystal_shards"] = available_shards - amount
+        user_data.crystal_shards = available_shards - amount
         race["wagers"][user_id] = total_new_wager
 
         # === Calculate total pot ===
         total_pot = sum(race["wagers"].values())
 
-        save_races()
-        save_users()
+        save_races(channel_id)
+        save_users(user_id)
 
         await interaction.response.send_message(
             f"💎 {interaction.user.mention} wagered **{amount}** shards "
@@ -89,15 +85,14 @@ def register(bot):
     async def userdetails(interaction: discord.Interaction, user: discord.User = None):
         target = user or interaction.user
         user_id = str(target.id)
-        ensure_user_exists(user_id)
-        data = users.get(user_id, {"shards": 0, "races_joined": {}, "races_won": {}})
-        lines = [f"📊 Stats for **{target.display_name}**", f"💎 Shards: `{data['crystal_shards']}`"]
-        if not data["races_joined"]:
+        data = ensure_user_exists(user_id)
+        lines = [f"📊 Stats for **{target.display_name}**", f"💎 Shards: `{data.crystal_shards}`"]
+        if not data.races_joined:
             lines.append("No race history.")
         else:
             lines.append("🏁 Races by Randomizer:")
-            for rando in sorted(set(list(data["races_joined"].keys()) + list(data["races_won"].keys()))):
-                lines.append(f"• **{rando}**: {data['races_joined'].get(rando, 0)} joined, {data['races_won'].get(rando, 0)} won")
+            for rando in sorted(set(data.races_joined) | set(data.races_won)):
+                lines.append(f"• **{rando}**: {data.races_joined.get(rando, 0)} joined, {data.races_won.get(rando, 0)} won")
         await interaction.response.send_message("\n".join(lines), ephemeral=False)
 
     @bot.tree.command(name="addpreset", description="Add a preset to a randomizer")
@@ -110,17 +105,9 @@ def register(bot):
         app_commands.Choice(name="FFMQR", value="FFMQR")
     ])
     async def addpreset(interaction: discord.Interaction, randomizer: app_commands.Choice[str], name: str, flags: str):
-        file_path = PRESET_FILES.get(randomizer.value)
-        if not file_path:
+        if not add_preset(randomizer.value, name, flags):
             await interaction.response.send_message("❌ Preset file path missing.", ephemeral=True)
             return
-        presets = {}
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                presets = json.load(f)
-        presets[name] = flags
-        with open(file_path, "w") as f:
-            json.dump(presets, f, indent=2)
         await interaction.response.send_message(f"✅ Preset `{name}` added to {randomizer.name}.", ephemeral=True)
 
     @bot.tree.command(name="listpresets", description="List all presets for a randomizer")